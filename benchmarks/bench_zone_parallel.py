@@ -0,0 +1,37 @@
+# bench_zone_parallel.py
+"""Times serial against zone-parallel generation of one deep profile.
+
+Run from the repository root: python benchmarks/bench_zone_parallel.py [max_depth] [workers]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import ProfileGenerator
+
+
+def main(max_depth=20000, workers=None):
+    generator = ProfileGenerator(seed=0)
+    depth_choice = list(range(0, max_depth + 1, 2))
+    zone_percentages = generator.generate_unique_zone_percentages()
+
+    start = time.perf_counter()
+    generator.generate_profile(depth_choice, zone_percentages, "Lake sediment", "Peatland", seed=1)
+    serial = time.perf_counter() - start
+
+    # The first call starts the pool; time a second one, as a long-running server would see it
+    generator.generate_profile_parallel(depth_choice, zone_percentages, "Lake sediment", "Peatland", seed=1, workers=workers)
+    start = time.perf_counter()
+    generator.generate_profile_parallel(depth_choice, zone_percentages, "Lake sediment", "Peatland", seed=1, workers=workers)
+    parallel = time.perf_counter() - start
+
+    print(f"{len(depth_choice)} rows, {os.cpu_count()} cores")
+    print(f"serial   {serial:.2f} s")
+    print(f"parallel {parallel:.2f} s  ({serial / parallel:.2f}x)")
+    print(f"bound    {100 / max(zone_percentages):.2f}x  (largest zone is {max(zone_percentages):.0f}% of the rows)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,110 @@
+# bulk_export.py
+import csv
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from profile_generator import COLUMNS
+
+MANIFEST_COLUMNS = ["file", "sheet", "seed", "base_type", "env_type", "zone_percentages", "rows"]
+
+
+class BulkExporter:
+    """
+    Writes many profiles into a single zip archive as they are produced.
+
+    Every profile becomes its own CSV member, written row by row straight into the
+    compressed stream, and a manifest.csv records seed and scenario per profile.
+    With xlsx=True the profiles are also added as sheets of one workbook built in
+    openpyxl's write-only mode, which streams rows to a temporary file instead of
+    keeping cells in memory. Only the profile being written is ever held in memory.
+    """
+
+    def __init__(self, target, xlsx=False, columns=COLUMNS):
+        """`target` is a path or a writable binary file object."""
+        self.archive = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self.columns = list(columns)
+        self.count = 0
+        self.manifest = tempfile.TemporaryFile("w+", encoding="utf-8", newline="")  # Spooled to disk, not kept in memory
+        self.manifest_writer = csv.writer(self.manifest)
+        self.manifest_writer.writerow(MANIFEST_COLUMNS)
+
+        self.workbook = None
+        if xlsx:
+            import openpyxl  # Only needed for the optional workbook
+            self.workbook = openpyxl.Workbook(write_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, profile):
+        """Writes one generate_seeded_profile() result and returns its member name."""
+        self.count += 1
+        name = f"profile_{self.count:06d}.csv"
+        data = profile["data"]
+
+        with self.archive.open(name, "w", force_zip64=True) as member:
+            text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(self.columns)
+            for row in data:
+                writer.writerow([row[col] for col in self.columns])
+            text.flush()
+            text.detach()  # Leave closing the member to the with-block
+
+        sheet = ""
+        if self.workbook is not None:
+            sheet = f"Profile {self.count}"
+            worksheet = self.workbook.create_sheet(title=sheet)
+            worksheet.append(self.columns)
+            for row in data:
+                worksheet.append([row[col] for col in self.columns])
+            worksheet.close()  # Flush the sheet's temp file now instead of holding it open until save
+
+        self.manifest_writer.writerow([
+            name, sheet, profile.get("seed"), profile.get("base_type"), profile.get("env_type"),
+            " ".join(f"{p:.2f}" for p in profile.get("zone_percentages", [])), len(data),
+        ])
+        return name
+
+    def add_all(self, profiles):
+        """Consumes an iterable of profiles, e.g. ProfileGenerator.generate_batch()."""
+        for profile in profiles:
+            self.add(profile)
+
+    def close(self):
+        """Writes the manifest (and workbook) and finalizes the archive."""
+        if self.archive is None:
+            return
+
+        self.manifest.seek(0)
+        with self.archive.open("manifest.csv", "w") as member:
+            text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+            shutil.copyfileobj(self.manifest, text)
+            text.flush()
+            text.detach()
+        self.manifest.close()
+
+        if self.workbook is not None:
+            fd, tmp_path = tempfile.mkstemp(suffix=".xlsx")
+            os.close(fd)
+            try:
+                self.workbook.save(tmp_path)
+                self.archive.write(tmp_path, "profiles.xlsx")
+            finally:
+                os.remove(tmp_path)
+            self.workbook = None
+
+        self.archive.close()
+        self.archive = None
+
+
+def export_batch(target, profiles, xlsx=False):
+    """Streams an iterable of profiles into a zip archive at `target`; returns the profile count."""
+    with BulkExporter(target, xlsx=xlsx) as exporter:
+        exporter.add_all(profiles)
+        return exporter.count
@@ -0,0 +1,106 @@
+# compact_values.py
+import numpy as np
+from profile_generator import COLUMNS
+
+SCALE = 100  # Generated values carry two decimals, so they are stored as hundredths
+INT16_LIMIT = np.iinfo(np.int16).max - 1  # Leaves the most negative value free as the missing marker
+
+
+def missing_value(dtype):
+    """Integer marker for a missing value (e.g. NaN padding) in a fixed-point array."""
+    return np.iinfo(dtype).min
+
+
+def fixed_dtype(values):
+    """Picks int16 when the scaled values fit, int32 otherwise."""
+    finite = np.asarray(values, dtype=float)
+    finite = finite[np.isfinite(finite)]
+    if finite.size == 0 or np.round(np.abs(finite).max() * SCALE) <= INT16_LIMIT:  # Round away float error
+        return np.dtype(np.int16)
+    return np.dtype(np.int32)
+
+
+def to_fixed(values, dtype=None):
+    """Converts 2-decimal floats to scaled integers; NaN becomes the missing marker."""
+    values = np.asarray(values, dtype=float)
+    dtype = np.dtype(dtype) if dtype is not None else fixed_dtype(values)
+    missing = np.isnan(values)
+    scaled = np.round(np.where(missing, 0, values) * SCALE)
+    if np.any(np.abs(scaled - np.where(missing, 0, values) * SCALE) > 1e-6):
+        raise ValueError("Values have more than two decimals and cannot be stored losslessly.")
+    info = np.iinfo(dtype)
+    if scaled.size and (scaled.min() <= info.min or scaled.max() > info.max):
+        raise OverflowError(f"Values do not fit in {dtype.name} hundredths.")
+    fixed = scaled.astype(dtype)
+    fixed[missing] = missing_value(dtype)
+    return fixed
+
+
+def from_fixed(fixed):
+    """Converts scaled integers back to 2-decimal floats; the missing marker becomes NaN."""
+    fixed = np.asarray(fixed)
+    values = np.round(fixed / SCALE, 2)
+    values[fixed == missing_value(fixed.dtype)] = np.nan
+    return values
+
+
+class CompactProfile:
+    """
+    One profile stored as contiguous fixed-point columns instead of a list of row dicts.
+
+    Each column is an int16 or int32 array of hundredths (int16 wherever the column's
+    range allows) and Zone is an int8 array with 0 for rows outside every zone, so a
+    500-row profile takes a few kilobytes instead of several hundred.
+    """
+
+    def __init__(self, columns, zone):
+        self.columns = columns  # {name: fixed-point array}, Depth included
+        self.zone = zone
+
+    @classmethod
+    def from_records(cls, data, columns=COLUMNS):
+        """Builds the compact form from the row dicts returned by generate_profile."""
+        columns = [col for col in columns if col != "Zone"]
+        fixed = {col: to_fixed([row[col] for row in data]) for col in columns}
+        zone = np.array([row["Zone"] or 0 for row in data], dtype=np.int8)
+        return cls(fixed, zone)
+
+    def __len__(self):
+        return len(self.zone)
+
+    @property
+    def nbytes(self):
+        """Bytes used by the column arrays."""
+        return self.zone.nbytes + sum(col.nbytes for col in self.columns.values())
+
+    def column(self, name):
+        """Returns one column as 2-decimal floats."""
+        if name == "Zone":
+            return self.zone.copy()
+        return from_fixed(self.columns[name])
+
+    def to_records(self):
+        """Returns the profile as the list of row dicts produced by generate_profile."""
+        names = list(self.columns)
+        decoded = [self.column(name).tolist() for name in names]
+        records = []
+        for i, zone in enumerate(self.zone.tolist()):
+            row = {"Depth": None, "Zone": zone or None}
+            for name, values in zip(names, decoded):
+                row[name] = values[i]
+            if row["Depth"].is_integer():
+                row["Depth"] = int(row["Depth"])  # generate_profile uses the integer depth grid
+            records.append(row)
+        return records
+
+    def save(self, file):
+        """Writes the fixed-point columns to an .npz file (path or binary file object)."""
+        np.savez_compressed(file, Zone=self.zone, **self.columns)
+
+    @classmethod
+    def load(cls, file):
+        """Reads a profile written by save()."""
+        with np.load(file) as archive:
+            zone = archive["Zone"]
+            columns = {name: archive[name] for name in archive.files if name != "Zone"}
+        return cls(columns, zone)
@@ -0,0 +1,144 @@
+# ensemble_stats.py
+import numpy as np
+from profile_generator import PARAMETERS
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+UNIT = 0.01  # Generated values carry two decimals
+
+
+def to_log_scale(values, unit=UNIT):
+    """Signed log scale used by the sketch: equal steps are equal relative steps away from zero."""
+    return np.sign(values) * np.log1p(np.abs(values) / unit)
+
+
+def from_log_scale(scaled, unit=UNIT):
+    """Inverse of to_log_scale."""
+    return np.sign(scaled) * unit * np.expm1(np.abs(scaled))
+
+
+class EnsembleAggregator:
+    """
+    Online per-depth, per-parameter statistics over many profiles.
+
+    Profiles are consumed one at a time; memory is fixed by the depth grid, the
+    number of parameters and `bins`, at 4 bytes per bin and cell: with the defaults
+    16 parameters x 501 depths x 1024 bins is about 33 MB per aggregator, so per
+    worker when workers fill their own. Mean, variance, min and max are exact
+    (Welford). Quantiles come from a log-bucket sketch per cell: buckets are evenly
+    spaced on a signed log scale covering -max_abs..max_abs, so no per-parameter
+    limits are needed and the error is relative, up to one bucket width:
+    e^(2 ln(max_abs / unit) / bins) - 1, about 3.2% of the value with the defaults
+    (a few hundredths near zero). Values beyond max_abs are clamped into the end
+    buckets and counted in `clamped`, so callers can tell when a band is affected.
+    Sketches over the same grid merge exactly, so parallel workers can each fill
+    their own aggregator and combine the results.
+    """
+
+    def __init__(self, depth_choice, parameters=PARAMETERS, bins=1024, max_abs=1e5):
+        self.depths = np.asarray(depth_choice, dtype=float)
+        self.parameters = list(parameters)
+        self.bins = bins
+        self.max_abs = max_abs
+        self.scale_limit = float(to_log_scale(max_abs))
+
+        shape = (len(self.parameters), len(self.depths))
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)  # Sum of squared deviations from the mean
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+        self.histogram = np.zeros(shape + (bins,), dtype=np.uint32)
+        self.clamped = np.zeros(shape, dtype=np.int64)  # Values beyond +-max_abs, per cell
+
+        # Index grids used to scatter one value per cell into the histogram
+        self._param_idx, self._depth_idx = np.indices(shape)
+
+    def update(self, data):
+        """Adds one profile, given as the list of row dicts from generate_profile."""
+        if len(data) != len(self.depths):
+            raise ValueError(f"Profile has {len(data)} rows, aggregator expects {len(self.depths)}.")
+        values = np.array([[row[param] for row in data] for param in self.parameters], dtype=float)
+        self.update_array(values)
+
+    def update_array(self, values):
+        """Adds one profile given as a (parameters, depths) array, e.g. an EnsembleStore slice."""
+        values = np.asarray(values, dtype=float)
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (values - self.mean)
+        np.minimum(self.min, values, out=self.min)
+        np.maximum(self.max, values, out=self.max)
+
+        self.clamped += np.abs(values) > self.max_abs
+        self.histogram[self._param_idx, self._depth_idx, self._bin_index(values)] += 1
+
+    def _bin_index(self, values):
+        position = (to_log_scale(values) + self.scale_limit) / (2 * self.scale_limit) * self.bins
+        return np.clip(np.floor(position).astype(np.int64), 0, self.bins - 1)
+
+    def update_from_store(self, store):
+        """Adds every profile of an EnsembleStore without converting rows to dicts."""
+        rows = [store.columns.index(param) for param in self.parameters]
+        for index in range(len(store)):
+            self.update_array(store.decode(store.profile(index)[rows]))
+
+    def merge(self, other):
+        """Folds another aggregator over the same depth grid and sketch layout into this one."""
+        if (self.parameters != other.parameters or self.bins != other.bins or self.max_abs != other.max_abs
+                or not np.array_equal(self.depths, other.depths)):
+            raise ValueError("Cannot merge aggregators with different grids, parameters or sketch layouts.")
+        if other.count == 0:
+            return self
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / total
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        self.histogram += other.histogram
+        self.clamped += other.clamped
+        return self
+
+    def variance(self):
+        """Sample variance per (parameter, depth)."""
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        return self.m2 / (self.count - 1)
+
+    def quantile(self, q):
+        """Approximate q-quantile per (parameter, depth), interpolated within sketch buckets."""
+        if self.count == 0:
+            return np.full_like(self.mean, np.nan)
+        cumulative = np.cumsum(self.histogram, axis=-1, dtype=np.int64)
+        target = q * self.count
+        bin_idx = np.minimum((cumulative < target).sum(axis=-1), self.bins - 1)
+
+        below = np.where(bin_idx > 0,
+                         np.take_along_axis(cumulative, np.maximum(bin_idx - 1, 0)[..., None], axis=-1)[..., 0], 0)
+        in_bin = np.take_along_axis(self.histogram, bin_idx[..., None], axis=-1)[..., 0]
+        fraction = np.where(in_bin > 0, (target - below) / np.maximum(in_bin, 1), 0.5)
+
+        width = 2 * self.scale_limit / self.bins
+        estimate = from_log_scale(-self.scale_limit + (bin_idx + fraction) * width)
+        return np.clip(estimate, self.min, self.max)
+
+    def clamped_fraction(self):
+        """Share of values per (parameter, depth) that fell beyond max_abs; bands there are clamped."""
+        if self.count == 0:
+            return np.zeros_like(self.mean)
+        return self.clamped / self.count
+
+    def summary(self, quantiles=DEFAULT_QUANTILES):
+        """Returns {parameter: {"mean", "std", "min", "max", q: values}} arrays over depth."""
+        std = np.sqrt(self.variance())
+        bands = {q: self.quantile(q) for q in quantiles}
+        result = {}
+        for i, param in enumerate(self.parameters):
+            result[param] = {"mean": self.mean[i], "std": std[i], "min": self.min[i], "max": self.max[i],
+                             "clamped": self.clamped[i]}
+            for q, band in bands.items():
+                result[param][q] = band[i]
+        return result
@@ -0,0 +1,179 @@
+# ensemble_store.py
+import json
+import os
+import numpy as np
+from profile_generator import ProfileGenerator, BASE_TYPES, ENV_TYPES, COLUMNS
+from compact_values import SCALE, to_fixed, from_fixed, missing_value
+
+STORE_VERSION = 1
+HEADER_FILE = "header.json"
+VALUES_FILE = "values.dat"
+PROFILES_FILE = "profiles.dat"
+
+# Fixed-size per-profile metadata record: scenario, seed, depth grid length and zone boundaries
+PROFILE_DTYPE = np.dtype([
+    ("seed", "<i8"),
+    ("base_type", "<i1"),  # Index into BASE_TYPES
+    ("env_type", "<i1"),   # Index into ENV_TYPES
+    ("n_depths", "<i4"),   # Rows actually used; the rest of the profile block is NaN padding
+    ("zone_bounds", "<f8", (5, 2)),  # (start, end) depth of zones 1-5
+])
+
+
+class EnsembleStore:
+    """
+    On-disk ensemble of generated profiles, kept in memory-mapped arrays.
+
+    Values live in one fixed-layout array of shape (capacity, len(columns), n_depths),
+    so a profile, a parameter across all profiles, or a depth range of a profile are
+    all plain numpy views into the mapped file.
+
+    With dtype "int32" values are kept as fixed-point hundredths, which halves the
+    file compared with float64; the views then hold the raw integers and decode()
+    turns them back into 2-decimal floats.
+
+    The values file is created sparse: nothing is written until a profile is
+    appended, and append() pads only the unused tail of that profile's block.
+    """
+
+    def __init__(self, path, mode="r"):
+        """Opens an existing store; mode is "r" (read-only) or "r+" (append)."""
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            self.header = json.load(f)
+        if self.header["version"] != STORE_VERSION:
+            raise ValueError(f"Unsupported ensemble store version: {self.header['version']}")
+
+        self.mode = mode
+        self.columns = self.header["columns"]
+        self.fixed_point = np.issubdtype(np.dtype(self.header["dtype"]), np.integer)
+        self._column_index = {col: i for i, col in enumerate(self.columns)}
+        shape = (self.header["capacity"], len(self.columns), self.header["n_depths"])
+        self.values = np.memmap(os.path.join(path, VALUES_FILE), dtype=self.header["dtype"], mode=mode, shape=shape)
+        self.profiles = np.memmap(os.path.join(path, PROFILES_FILE), dtype=PROFILE_DTYPE, mode=mode,
+                                  shape=(self.header["capacity"],))
+
+    @classmethod
+    def create(cls, path, capacity, n_depths, columns=COLUMNS, dtype="float64"):
+        """Creates an empty store able to hold `capacity` profiles of up to `n_depths` rows."""
+        if np.issubdtype(np.dtype(dtype), np.integer) and np.dtype(dtype) != np.int32:
+            # One dtype covers every column, and Ca/Na/K reach 900-1400 (90000+ hundredths)
+            raise ValueError("Fixed-point ensemble stores use int32; use CompactProfile for per-column int16.")
+        os.makedirs(path, exist_ok=True)
+        header = {
+            "version": STORE_VERSION,
+            "capacity": capacity,
+            "n_depths": n_depths,
+            "columns": list(columns),
+            "dtype": np.dtype(dtype).str,
+            "scale": SCALE if np.issubdtype(np.dtype(dtype), np.integer) else 1,
+            "count": 0,
+        }
+        # Sparse on file systems that support it; append() writes each profile's block, padding included
+        values = np.memmap(os.path.join(path, VALUES_FILE), dtype=dtype, mode="w+",
+                           shape=(capacity, len(columns), n_depths))
+        del values
+        profiles = np.memmap(os.path.join(path, PROFILES_FILE), dtype=PROFILE_DTYPE, mode="w+", shape=(capacity,))
+        profiles.flush()
+        del profiles
+        with open(os.path.join(path, HEADER_FILE), "w") as f:
+            json.dump(header, f)
+        return cls(path, mode="r+")
+
+    @classmethod
+    def from_batch(cls, path, count, depth_choice, base_type, env_type, seed=0, generator=None, dtype="float64"):
+        """Creates a store and fills it straight from ProfileGenerator.generate_batch."""
+        generator = generator or ProfileGenerator()
+        store = cls.create(path, count, len(depth_choice), dtype=dtype)
+        for profile in generator.generate_batch(count, depth_choice, base_type, env_type, seed=seed):
+            store.append(profile)
+        store.flush()
+        return store
+
+    def __len__(self):
+        return self.header["count"]
+
+    def append(self, profile):
+        """Writes one generate_seeded_profile() result and returns its index."""
+        if self.mode == "r":
+            raise ValueError("Ensemble store is opened read-only.")
+        index = self.header["count"]
+        if index >= self.header["capacity"]:
+            raise IndexError("Ensemble store is full.")
+
+        data = profile["data"]
+        if len(data) > self.header["n_depths"]:
+            raise ValueError(f"Profile has {len(data)} rows, store holds at most {self.header['n_depths']}.")
+
+        block = self.values[index]
+        for i, col in enumerate(self.columns):
+            column = [np.nan if row[col] is None else row[col] for row in data]
+            block[i, :len(data)] = to_fixed(column, self.values.dtype) if self.fixed_point else column
+        block[:, len(data):] = missing_value(self.values.dtype) if self.fixed_point else np.nan
+
+        record = self.profiles[index]
+        record["seed"] = profile["seed"]
+        record["base_type"] = BASE_TYPES.index(profile["base_type"])
+        record["env_type"] = ENV_TYPES.index(profile["env_type"])
+        record["n_depths"] = len(data)
+        record["zone_bounds"] = [profile["zones"][z] for z in sorted(profile["zones"])]
+
+        self.header["count"] = index + 1
+        return index
+
+    def flush(self):
+        """Flushes the mapped arrays and records the profile count in the header."""
+        self.values.flush()
+        self.profiles.flush()
+        tmp_path = os.path.join(self.path, HEADER_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.header, f)
+        os.replace(tmp_path, os.path.join(self.path, HEADER_FILE))
+
+    def decode(self, block):
+        """Returns a slice of the store as floats (a copy for fixed-point stores, else the view itself)."""
+        return from_fixed(block) if self.fixed_point else block
+
+    def _check_index(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(f"Profile index {index} out of range for store of {len(self)} profiles.")
+
+    def profile(self, index):
+        """Returns a (columns, depths) view of one profile, without the padding rows."""
+        self._check_index(index)
+        return self.values[index, :, :self.profiles[index]["n_depths"]]
+
+    def parameter(self, name):
+        """Returns a (profiles, depths) view of one column across the stored profiles."""
+        return self.values[:len(self), self._column_index[name], :]
+
+    def depth_range(self, index, top, bottom):
+        """Returns a (columns, depths) view of one profile restricted to top <= Depth <= bottom."""
+        block = self.profile(index)
+        depths = self.decode(block[self._column_index["Depth"]])
+        start = np.searchsorted(depths, top, side="left")
+        stop = np.searchsorted(depths, bottom, side="right")
+        return block[:, start:stop]
+
+    def metadata(self, index):
+        """Returns the scenario, seed and zone boundaries recorded for one profile."""
+        self._check_index(index)
+        record = self.profiles[index]
+        return {
+            "seed": int(record["seed"]),
+            "base_type": BASE_TYPES[record["base_type"]],
+            "env_type": ENV_TYPES[record["env_type"]],
+            "n_depths": int(record["n_depths"]),
+            "zones": {z + 1: (float(start), float(end)) for z, (start, end) in enumerate(record["zone_bounds"])},
+        }
+
+    def to_records(self, index):
+        """Returns one profile as the list of row dicts produced by generate_profile."""
+        block = self.decode(self.profile(index))
+        records = []
+        for row in block.T:
+            record = dict(zip(self.columns, (float(v) for v in row)))
+            if "Zone" in record:
+                record["Zone"] = None if np.isnan(record["Zone"]) else int(record["Zone"])  # Rows outside every zone
+            records.append(record)
+        return records
@@ -0,0 +1,54 @@
+# interactive_chart.py
+import pandas as pd
+
+MAX_CHART_ROWS = 1500  # Rows sent to the browser before the profile is thinned out
+
+
+def downsample(data, max_rows=MAX_CHART_ROWS):
+    """Thins a profile to at most ~max_rows rows, keeping the first and last depth."""
+    if len(data) <= max_rows:
+        return data
+    stride = -(-len(data) // max_rows)  # Ceiling division
+    rows = data[::stride]
+    if rows[-1] is not data[-1]:
+        rows.append(data[-1])  # Keep the bottom of the core on the chart
+    return rows
+
+
+def chart_data(data, max_rows=MAX_CHART_ROWS):
+    """Returns the compact DataFrame sent to the browser: Depth plus one column per parameter."""
+    df = pd.DataFrame(downsample(data, max_rows))
+    return df.drop(columns=["Zone"])
+
+
+def chart_spec(parameters, height=450):
+    """
+    Returns a Vega-Lite spec drawing one stepped depth panel per parameter.
+
+    The panels share the depth axis and a scale-bound selection, so dragging or
+    scrolling in any panel zooms and pans every panel together in the browser.
+    """
+    return {
+        "repeat": {"column": list(parameters)},
+        "spec": {
+            "width": 55,
+            "height": height,
+            "mark": {"type": "line", "interpolate": "step-after", "strokeWidth": 1},
+            "params": [{
+                "name": "depth_zoom",
+                "select": {"type": "interval", "encodings": ["y"]},
+                "bind": "scales",
+            }],
+            "encoding": {
+                "x": {"field": {"repeat": "column"}, "type": "quantitative",
+                      "axis": {"labelFontSize": 7, "titleFontSize": 9, "tickCount": 3}},
+                "y": {"field": "Depth", "type": "quantitative", "scale": {"reverse": True, "zero": False},
+                      "axis": {"labelFontSize": 7}},
+                "order": {"field": "Depth", "type": "quantitative"},
+                "tooltip": [{"field": "Depth", "type": "quantitative"},
+                            {"field": {"repeat": "column"}, "type": "quantitative"}],
+            },
+        },
+        "resolve": {"scale": {"x": "independent", "y": "shared"}},
+        "spacing": 4,
+    }
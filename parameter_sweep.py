@@ -0,0 +1,219 @@
+# parameter_sweep.py
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from profile_generator import ProfileGenerator, BASE_TYPES, ENV_TYPES, GENERATOR_VERSION
+from ensemble_store import EnsembleStore
+from profile_validator import ProfileValidator, RULES
+
+CHECKPOINT_FILE = "checkpoint.json"
+CATALOG_FILE = "catalog.sqlite"
+RESULTS_DIR = "results"
+
+DEFAULT_GRID = {
+    "base_types": BASE_TYPES,
+    "env_types": ENV_TYPES,
+    "depth_ranges": [(0, 1000)],
+    "custom_ranges": {"baseline": {}},  # name -> {zone: {param: (min, max, trend)}}
+    "replicates": 10,
+    "seed": 0,
+    "validate": False,  # True or a list of RULES; cells whose results break them are marked failed
+}
+
+
+def expand_grid(grid):
+    """Yields one cell dict per combination of base type, env type, depth range and perturbation."""
+    grid = {**DEFAULT_GRID, **grid}
+    for base_type, env_type, depth_range, perturbation in itertools.product(
+            grid["base_types"], grid["env_types"], grid["depth_ranges"], grid["custom_ranges"]):
+        yield {
+            "base_type": base_type,
+            "env_type": env_type,
+            "depth_range": tuple(depth_range),
+            "perturbation": perturbation,
+        }
+
+
+def compile_cell(cell, grid):
+    """Returns the effective range table {zone: ranges} of a cell, perturbation applied."""
+    table = ProfileGenerator().compile_ranges(cell["base_type"], cell["env_type"])
+    overrides = {**DEFAULT_GRID, **grid}["custom_ranges"][cell["perturbation"]]
+    for zone, params in overrides.items():
+        table[int(zone)] = {**table[int(zone)], **{param: tuple(r) for param, r in params.items()}}
+    return table
+
+
+def task_key(table, depth_range, replicates, seed):
+    """Hash identifying everything that determines a cell's output, generator version included."""
+    payload = json.dumps([GENERATOR_VERSION, table, depth_range, replicates, seed], sort_keys=True, default=list)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def run_task(task):
+    """
+    Worker entry point: generates one deduplicated task into its own ensemble store.
+
+    Returns (key, profile count, violation counts); the counts are None unless the
+    task is validated, in which case they are also written to validation.json.
+    """
+    generator = ProfileGenerator()
+    for zone, ranges in task["table"].items():
+        generator.custom_ranges[(zone, task["base_type"], task["env_type"])] = ranges
+    min_depth, max_depth = task["depth_range"]
+    depth_choice = list(range(min_depth, max_depth + 1, 2))
+    store = EnsembleStore.from_batch(task["path"], task["replicates"], depth_choice, task["base_type"],
+                                     task["env_type"], seed=task["seed"], generator=generator, dtype="int32")
+    violations = None
+    if task["validate"]:
+        violations = ProfileValidator(generator).validate_store(store).summary()
+        with open(os.path.join(task["path"], "validation.json"), "w") as f:
+            json.dump(violations, f)
+    return task["key"], len(store), violations
+
+
+class SweepRunner:
+    """
+    Runs a declarative grid of scenarios and custom-range perturbations.
+
+    Cells whose compiled range tables, depth range and seeds are identical are
+    generated only once and share their result. Tasks run on a process pool; every
+    finished task is recorded in a checkpoint file, so re-running an interrupted
+    sweep only does the remaining work. Results are indexed per cell in a SQLite
+    catalog for lookup.
+
+    With "validate" set, every task is checked with ProfileValidator and its
+    violation counts are kept in the checkpoint. A cell whose counts break one of
+    the gated rules (all RULES for True) is catalogued as failed, not complete,
+    and SweepCatalog.open refuses it. The built-in ranges already break "range"
+    and, for Peatland, "trend_monotonic", so gating on every rule fails them.
+    """
+
+    def __init__(self, grid, output_dir, workers=None):
+        self.grid = {**DEFAULT_GRID, **grid}
+        self.output_dir = output_dir
+        self.workers = workers
+        validate = self.grid["validate"]
+        self.gate = list(RULES) if validate is True else list(validate or [])
+        unknown = set(self.gate) - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown validation rules: {sorted(unknown)}")
+        os.makedirs(os.path.join(output_dir, RESULTS_DIR), exist_ok=True)
+
+    def plan(self):
+        """Returns (cells, tasks): every cell with its task key, and the unique tasks by key."""
+        cells, tasks = [], {}
+        for cell in expand_grid(self.grid):
+            table = compile_cell(cell, self.grid)
+            key = task_key(table, cell["depth_range"], self.grid["replicates"], self.grid["seed"])
+            cells.append({**cell, "key": key})
+            if key not in tasks:
+                tasks[key] = {
+                    "key": key,
+                    "table": table,
+                    "base_type": cell["base_type"],
+                    "env_type": cell["env_type"],
+                    "depth_range": cell["depth_range"],
+                    "replicates": self.grid["replicates"],
+                    "seed": self.grid["seed"],
+                    "validate": bool(self.gate),
+                    "path": os.path.join(self.output_dir, RESULTS_DIR, key),
+                }
+        return cells, tasks
+
+    def _load_checkpoint(self):
+        """Returns (completed task keys, {validated task key: violation counts})."""
+        path = os.path.join(self.output_dir, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return set(), {}
+        with open(path) as f:
+            checkpoint = json.load(f)
+        return set(checkpoint["completed"]), checkpoint.get("violations", {})
+
+    def _save_checkpoint(self, completed, violations):
+        path = os.path.join(self.output_dir, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"completed": sorted(completed), "violations": violations}, f, sort_keys=True)
+        os.replace(path + ".tmp", path)  # Atomic, so an interrupt never leaves a torn checkpoint
+
+    def run(self):
+        """Runs the pending tasks and writes the catalog; returns the number of tasks run now."""
+        cells, tasks = self.plan()
+        completed, violations = self._load_checkpoint()
+        # A task done without validation is run again once a gate is set
+        pending = [task for key, task in tasks.items()
+                   if key not in completed or (self.gate and key not in violations)]
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(run_task, task) for task in pending]
+                for future in as_completed(futures):
+                    key, _, counts = future.result()
+                    completed.add(key)
+                    if counts is not None:
+                        violations[key] = counts
+                    self._save_checkpoint(completed, violations)
+
+        failed = {key: counts for key, counts in violations.items() if any(counts[rule] for rule in self.gate)}
+        self._write_catalog(cells, failed)
+        return len(pending)
+
+    def _write_catalog(self, cells, failed):
+        with sqlite3.connect(os.path.join(self.output_dir, CATALOG_FILE)) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cells (
+                    base_type TEXT, env_type TEXT, min_depth INTEGER, max_depth INTEGER,
+                    perturbation TEXT, task_key TEXT, status TEXT, violations TEXT,
+                    PRIMARY KEY (base_type, env_type, min_depth, max_depth, perturbation)
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS cells_task ON cells (task_key)")
+            conn.executemany(
+                "INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(c["base_type"], c["env_type"], c["depth_range"][0], c["depth_range"][1], c["perturbation"], c["key"],
+                  "failed" if c["key"] in failed else "complete",
+                  json.dumps(failed[c["key"]], sort_keys=True) if c["key"] in failed else None)
+                 for c in cells])
+
+
+class SweepCatalog:
+    """Looks up the results of a finished sweep by cell."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.conn = sqlite3.connect(os.path.join(output_dir, CATALOG_FILE))
+
+    def task_key(self, base_type, env_type, depth_range=(0, 1000), perturbation="baseline"):
+        """Returns the task key holding a cell's results, or None if the cell is not in the sweep."""
+        row = self.conn.execute(
+            "SELECT task_key FROM cells WHERE base_type = ? AND env_type = ? AND min_depth = ? AND max_depth = ?"
+            " AND perturbation = ?", (base_type, env_type, depth_range[0], depth_range[1], perturbation)).fetchone()
+        return row[0] if row else None
+
+    def status(self, base_type, env_type, depth_range=(0, 1000), perturbation="baseline"):
+        """Returns ("complete" or "failed", {rule: violation count} or None) for a cell."""
+        row = self.conn.execute(
+            "SELECT status, violations FROM cells WHERE base_type = ? AND env_type = ? AND min_depth = ?"
+            " AND max_depth = ? AND perturbation = ?",
+            (base_type, env_type, depth_range[0], depth_range[1], perturbation)).fetchone()
+        if row is None:
+            raise KeyError(f"No sweep cell for {base_type}/{env_type} {depth_range} {perturbation}.")
+        return row[0], json.loads(row[1]) if row[1] else None
+
+    def open(self, base_type, env_type, depth_range=(0, 1000), perturbation="baseline", allow_failed=False):
+        """Opens a cell's results as a read-only EnsembleStore; failed cells only with allow_failed."""
+        key = self.task_key(base_type, env_type, depth_range, perturbation)
+        if key is None:
+            raise KeyError(f"No sweep cell for {base_type}/{env_type} {depth_range} {perturbation}.")
+        status, violations = self.status(base_type, env_type, depth_range, perturbation)
+        if status == "failed" and not allow_failed:
+            raise ValueError(f"Sweep cell {base_type}/{env_type} {depth_range} {perturbation} failed validation: {violations}")
+        return EnsembleStore(os.path.join(self.output_dir, RESULTS_DIR, key))
+
+    def cells(self):
+        """Lists every (base_type, env_type, min_depth, max_depth, perturbation, task_key, status, violations) row."""
+        return self.conn.execute("SELECT * FROM cells ORDER BY base_type, env_type, min_depth, perturbation").fetchall()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,123 @@
+# profile_cache.py
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from profile_generator import GENERATOR_VERSION
+from compact_values import CompactProfile
+
+DEFAULT_CACHE_PATH = os.environ.get("PPR_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "ppr", "profiles.sqlite"))
+DEFAULT_CACHE_MB = float(os.environ.get("PPR_CACHE_MB", 512))
+TOUCH_BATCH = 64  # Cache hits whose last_used update is written in one go
+TOUCH_INTERVAL = 30.0  # Seconds after which pending last_used updates are written anyway
+
+
+class ProfileCache:
+    """
+    Persistent, content-addressed cache of generated profiles, shared across restarts.
+
+    Entries are keyed by a hash of everything that determines a profile (seed, depth
+    grid, zone percentages, base/env type, effective range table and generator
+    version) and stored as compressed fixed-point columns in SQLite. SQLite in WAL
+    mode makes it safe for several server or batch processes at once; every thread
+    gets its own connection. When the total size passes the cap, the least recently
+    used entries are deleted.
+
+    The total size is kept in a one-row meta table, updated in the same transaction
+    as each insert or eviction, so a put never scans the table. A cache hit is a
+    plain read: its last_used update is queued and written with the next put, or
+    once TOUCH_BATCH hits or TOUCH_INTERVAL seconds have piled up. The LRU order is
+    therefore approximate across processes.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_mb=DEFAULT_CACHE_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.local = threading.local()
+        self.touched = {}  # key -> last_used not yet written
+        self.touched_since = time.time()
+        self.touch_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS profiles_last_used ON profiles (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)")
+            # Seeds the running total once, also for a cache file written before the meta table existed
+            conn.execute("INSERT OR IGNORE INTO meta SELECT 0, COALESCE(SUM(size), 0) FROM profiles")
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(seed, depth_choice, zone_percentages, base_type, env_type, range_table):
+        """Content hash of every input that determines a generated profile."""
+        payload = json.dumps([GENERATOR_VERSION, seed, list(depth_choice), list(zone_percentages),
+                              base_type, env_type, range_table], sort_keys=True, default=list)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached profile rows for a key, or None."""
+        row = self._connection().execute("SELECT data FROM profiles WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.touch_lock:
+            self.touched[key] = time.time()
+            due = len(self.touched) >= TOUCH_BATCH or time.time() - self.touched_since >= TOUCH_INTERVAL
+        if due:
+            with self._connection() as conn:
+                self._write_touches(conn)
+        return CompactProfile.load(io.BytesIO(row[0])).to_records()
+
+    def _write_touches(self, conn):
+        """Writes the queued last_used updates within the caller's transaction."""
+        with self.touch_lock:
+            touched, self.touched = self.touched, {}
+            self.touched_since = time.time()
+        conn.executemany("UPDATE profiles SET last_used = ? WHERE key = ?",
+                         [(last_used, key) for key, last_used in touched.items()])
+
+    def put(self, key, data):
+        """Stores profile rows under a key and evicts old entries past the size cap."""
+        buf = io.BytesIO()
+        CompactProfile.from_records(data).save(buf)
+        blob = buf.getvalue()
+        with self._connection() as conn:
+            # The first write takes the write lock, so the replaced entry's size cannot change under us
+            conn.execute("UPDATE meta SET total = total + ? - COALESCE((SELECT size FROM profiles WHERE key = ?), 0)",
+                         (len(blob), key))
+            self._write_touches(conn)  # So eviction sees this process's recent hits
+            conn.execute("INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?)", (key, blob, len(blob), time.time()))
+            total = conn.execute("SELECT total FROM meta").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total - self.max_bytes)
+
+    def _evict(self, conn, excess):
+        """Deletes least recently used entries until `excess` bytes are freed."""
+        freed, stale = 0, []
+        cursor = conn.execute("SELECT key, size FROM profiles ORDER BY last_used")
+        for key, size in cursor:
+            if freed >= excess:
+                break
+            stale.append((key,))
+            freed += size
+        cursor.close()
+        conn.executemany("DELETE FROM profiles WHERE key = ?", stale)
+        conn.execute("UPDATE meta SET total = total - ?", (freed,))
+
+    def stats(self):
+        """Returns the entry count and stored bytes."""
+        conn = self._connection()
+        count = conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+        size = conn.execute("SELECT total FROM meta").fetchone()[0]
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes}
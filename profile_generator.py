@@ -1,23 +1,62 @@
 # profile_generator.py
+import os
 import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
 import matplotlib
 import matplotlib.pyplot as plt
 matplotlib.use('Agg')  # Use Agg backend to save plots
 
+BASE_TYPES = ["Rock", "Sand", "Paleosol", "Lake sediment"]
+ENV_TYPES = ["Lake", "Peatland", "Wetland"]
+PARAMETERS = ["OM", "CC", "IM", "Clay", "Silt", "Sand", "MS", "CH", "AP", "NAP", "WL", "CR", "Ca", "Mg", "Na", "K"]
+COLUMNS = ["Depth", "Zone"] + PARAMETERS  # Column order of a generated row
+GENERATOR_VERSION = "1"  # Bump whenever a change alters what a seed generates; part of the cache key
+
+# Suffixes of the per-parameter state kept by generate_value for the stateful trends
+TREND_STATE_SUFFIXES = ("_last_val_up", "_last_val_dn", "_lf_center", "_stagnant_center_sl",
+                        "_last_val_sl", "_stagnant_center_sh", "_last_val_sh")
+
+# Process pools of generate_profile_parallel, one per worker count, kept for later calls
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _shared_pool(workers):
+    """Returns the process pool with `workers` processes, creating it on first use."""
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return _pools[workers]
+
+
+def _generate_block(job):
+    """Worker entry point of generate_profile_parallel: generates the rows of one zone."""
+    custom_ranges, seed, depths, max_depth, zones, base_type, env_type = job
+    generator = ProfileGenerator(seed=seed)
+    generator.custom_ranges = custom_ranges
+    zone_num = next((z for z, (start, end) in zones.items() if start <= depths[0] <= end), None)
+    generator.init_stagnant_state(generator.get_parameter_ranges(base_type, env_type, zone_num))
+    return generator.generate_data(depths, zones, base_type, env_type, max_depth=max_depth)
+
+
 class ProfileGenerator:
-    def __init__(self):
+    def __init__(self, seed=None, cache=None):
         self.custom_ranges = {}  # Store custom ranges
         self.zones = [1, 2, 3, 4, 5]
+        self.rng = random.Random(seed)  # Own random stream, so seeded profiles are reproducible
+        self.cache = cache  # Optional ProfileCache consulted for seeded profiles
 
     def generate_unique_zone_percentages(self):
         """Generates 5 unique random numbers that sum to 100."""
         while True:
-            z1 = random.uniform(10, 20)
-            z2 = random.uniform(25, 50)
-            z3 = random.uniform(30, 60)
-            z4 = random.uniform(15, 30)
-            z5 = random.uniform(4, 8)
+            z1 = self.rng.uniform(10, 20)
+            z2 = self.rng.uniform(25, 50)
+            z3 = self.rng.uniform(30, 60)
+            z4 = self.rng.uniform(15, 30)
+            z5 = self.rng.uniform(4, 8)
             total = round(z1 + z2 + z3 + z4 + z5, 2)
             if  100-0.02 <= total <= 100+0.02:  #check the rounding
                 nums = [z1, z2, z3, z4, z5]
@@ -34,9 +73,11 @@ class ProfileGenerator:
             current_depth = float(round(zone_end / 2) * 2)
         return zones
 
-    def generate_data(self, depth_choice, zones, base_type, env_type):
+    def generate_data(self, depth_choice, zones, base_type, env_type, max_depth=None):
         """Generates the data for the table."""
         data = []
+        if max_depth is None:
+            max_depth = depth_choice[-1]  # Only differs when generating one block of a longer profile
 
         for d in depth_choice:
             zone_num = None
@@ -58,7 +99,7 @@ class ProfileGenerator:
             for param in all_params:
                 if param in ranges:
                     min_val, max_val, trend = ranges[param]
-                    row[param] = self.generate_value(d, depth_choice[-1], min_val, max_val, trend, param, zone_num, zones, data)  # depth_choice[-1] is max_depth
+                    row[param] = self.generate_value(d, max_depth, min_val, max_val, trend, param, zone_num, zones, data)
                 else:
                     row[param] = 0
 
@@ -69,7 +110,7 @@ class ProfileGenerator:
                     ranges["OM"][0], ranges["OM"][1], ranges["OM"][2],
                     ranges["CC"][0], ranges["CC"][1], ranges["CC"][2],
                     ranges["IM"][0], ranges["IM"][1], ranges["IM"][2],
-                    d, depth_choice[-1] #max_depth
+                    d, max_depth
                 )
             if "Clay" not in ranges:
                 row["Clay"], row["Silt"], row["Sand"] = 0, 0, 0
@@ -78,7 +119,7 @@ class ProfileGenerator:
                     ranges["Clay"][0], ranges["Clay"][1], ranges["Clay"][2],
                     ranges["Silt"][0], ranges["Silt"][1], ranges["Silt"][2],
                     ranges["Sand"][0], ranges["Sand"][1], ranges["Sand"][2],
-                    d, depth_choice[-1] #max_depth
+                    d, max_depth
                 )
             data.append(row)
         return data
@@ -90,16 +131,16 @@ class ProfileGenerator:
         normalized_depth = d / depth if depth > 0 else 0
 
         if trend == "SP":  # Sporadic: 70% chance to be 0
-            if random.random() < 0.7:
+            if self.rng.random() < 0.7:
                 return round(0, 2)
             else:
-                return round(random.uniform(min_val, max_val), 2)
+                return round(self.rng.uniform(min_val, max_val), 2)
 
         elif trend == "UP":  # Up: Increasing values
             if not hasattr(self, f'{param}_last_val_up'):
                 setattr(self, f'{param}_last_val_up', min_val * 1.3)  # Initialize
             last_val_up = getattr(self, f'{param}_last_val_up')
-            new_val = random.uniform(last_val_up, max_val * 0.7)
+            new_val = self.rng.uniform(last_val_up, max_val * 0.7)
             setattr(self, f'{param}_last_val_up', new_val)
             return round(new_val, 2)
 
@@ -107,7 +148,7 @@ class ProfileGenerator:
             if not hasattr(self, f'{param}_last_val_dn'):
                 setattr(self, f'{param}_last_val_dn', max_val * 0.7) # Initialize
             last_val_dn = getattr(self, f'{param}_last_val_dn')
-            new_val = random.uniform(min_val * 1.3, last_val_dn)
+            new_val = self.rng.uniform(min_val * 1.3, last_val_dn)
             setattr(self, f'{param}_last_val_dn', new_val)
             return round(new_val, 2)
 
@@ -116,24 +157,24 @@ class ProfileGenerator:
                 setattr(self, f'{param}_lf_center', (min_val + max_val) / 2)   # or some other initial value
             lf_center = getattr(self, f'{param}_lf_center')
             fluctuation = (max_val - min_val) * 0.4  # 40% fluctuation
-            new_val = random.uniform(lf_center - fluctuation, lf_center + fluctuation)
+            new_val = self.rng.uniform(lf_center - fluctuation, lf_center + fluctuation)
             setattr(self, f'{param}_lf_center', new_val)  # Update center for next call, creating slow drift
             return round(new_val, 2)
 
         elif trend == "HF":  # HighFluctuation
             fluctuation = (max_val - min_val) * 0.8  # 80% fluctuation
             center = (min_val + max_val) / 2
-            return round(random.uniform(center - fluctuation, center + fluctuation), 2)
+            return round(self.rng.uniform(center - fluctuation, center + fluctuation), 2)
 
         elif trend == "SL": #StagnantLow: first stagnant, then decreasing
-            midpoint_ratio = random.uniform(0.4, 0.6)
+            midpoint_ratio = self.rng.uniform(0.4, 0.6)
             midpoint = depth * midpoint_ratio
             if d <= midpoint:
                 if not hasattr(self, f'{param}_stagnant_center_sl'):
-                    setattr(self, f'{param}_stagnant_center_sl', random.uniform(min_val * 1.2, max_val * 0.8))
+                    setattr(self, f'{param}_stagnant_center_sl', self.rng.uniform(min_val * 1.2, max_val * 0.8))
                 stagnant_center_sl = getattr(self, f'{param}_stagnant_center_sl')
                 fluctuation = (max_val - min_val) * 0.05  # 5% fluctuation
-                return round(random.uniform(max(min_val, stagnant_center_sl - fluctuation), min(max_val, stagnant_center_sl + fluctuation)), 2)
+                return round(self.rng.uniform(max(min_val, stagnant_center_sl - fluctuation), min(max_val, stagnant_center_sl + fluctuation)), 2)
 
             else:
                 if not hasattr(self, f'{param}_last_val_sl'):
@@ -145,14 +186,14 @@ class ProfileGenerator:
                 return max(min_val, min(new_val, max_val)) #Limit the value
 
         elif trend == "SH": #StagnantHigh: first stagnant, then increasing
-            midpoint_ratio = random.uniform(0.4, 0.6)
+            midpoint_ratio = self.rng.uniform(0.4, 0.6)
             midpoint = depth * midpoint_ratio
             if d <= midpoint:
                 if not hasattr(self, f'{param}_stagnant_center_sh'):
-                    setattr(self, f'{param}_stagnant_center_sh', random.uniform(min_val * 1.2, max_val * 0.8))
+                    setattr(self, f'{param}_stagnant_center_sh', self.rng.uniform(min_val * 1.2, max_val * 0.8))
                 stagnant_center_sh = getattr(self, f'{param}_stagnant_center_sh')
                 fluctuation = (max_val - min_val) * 0.05
-                return round(random.uniform(max(min_val, stagnant_center_sh - fluctuation), min(max_val, stagnant_center_sh + fluctuation)), 2)
+                return round(self.rng.uniform(max(min_val, stagnant_center_sh - fluctuation), min(max_val, stagnant_center_sh + fluctuation)), 2)
             else:
                 if not hasattr(self, f'{param}_last_val_sh'):
                     setattr(self, f'{param}_last_val_sh', getattr(self, f'{param}_stagnant_center_sh')) #initialize with the stagnant value
@@ -164,7 +205,7 @@ class ProfileGenerator:
                 return max(min_val, min(new_val, max_val))  #Limit the value
 
         elif trend == "UD":  # UpDown
-            midpoint_ratio = random.uniform(0.4, 0.6)
+            midpoint_ratio = self.rng.uniform(0.4, 0.6)
             midpoint = zones[zone_num][0] + (zones[zone_num][1] - zones[zone_num][0]) * midpoint_ratio
 
             if d <= midpoint:
@@ -177,7 +218,7 @@ class ProfileGenerator:
                 return round(float(max_val - (max_val - min_val) * normalized_zone_depth), 2)
 
         elif trend == "DU":  # DownUp
-            midpoint_ratio = random.uniform(0.4, 0.6)
+            midpoint_ratio = self.rng.uniform(0.4, 0.6)
             midpoint = zones[zone_num][0] + (zones[zone_num][1] - zones[zone_num][0]) * midpoint_ratio
 
             if d <= midpoint:
@@ -190,16 +231,128 @@ class ProfileGenerator:
                 return round(float(min_val + (max_val - min_val) * normalized_zone_depth), 2)
 
         elif trend == "RM": # Random
-            return round(random.uniform(min_val, max_val), 2)
+            return round(self.rng.uniform(min_val, max_val), 2)
 
 
-    def generate_profile(self, depth_choice, zone_percentages, base_type, env_type):
-        """Generates the paleo profile based on user selections."""
+    def generate_profile(self, depth_choice, zone_percentages, base_type, env_type, seed=None):
+        """Generates the paleo profile based on user selections.
 
+        With a seed the random stream is reseeded first, which makes the profile
+        reproducible and lets it be served from the cache, if one is set.
+        """
+
+        if seed is None:
+            zones = self.assign_depths_to_zones(depth_choice, zone_percentages)
+            return self.generate_data(depth_choice, zones, base_type, env_type)
+
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(seed, depth_choice, zone_percentages, base_type, env_type,
+                                 self.compile_ranges(base_type, env_type))
+            data = self.cache.get(key)
+            if data is not None:
+                return data
+
+        self.rng.seed(seed)
+        self.reset_trend_state()  # Same seed must give the same profile on a reused generator
         zones = self.assign_depths_to_zones(depth_choice, zone_percentages)
         data = self.generate_data(depth_choice, zones, base_type, env_type)
+        if key is not None:
+            self.cache.put(key, data)
         return data
 
+    def split_blocks(self, depth_choice, zones):
+        """Splits the depth grid into runs of consecutive depths in the same zone."""
+        blocks, current, current_zone = [], [], None
+        for d in depth_choice:
+            zone_num = next((z for z, (start, end) in zones.items() if start <= d <= end), None)
+            if current and zone_num != current_zone:
+                blocks.append(current)
+                current = []
+            current.append(d)
+            current_zone = zone_num
+        if current:
+            blocks.append(current)
+        return blocks
+
+    def generate_profile_parallel(self, depth_choice, zone_percentages, base_type, env_type, seed=0,
+                                  workers=None, executor=None):
+        """Generates one profile with its zones on a process pool, one job per zone.
+
+        This is zone-level parallelism only. Each zone gets its own random stream
+        derived from the seed and starts with fresh trend state (SL/SH stagnant
+        centres are drawn up front, see init_stagnant_state), so trends do not carry
+        over from the zone above as they do in generate_profile. The result depends
+        on the seed only, not on the number of workers.
+
+        A zone is never split further, because its UP/DN/LF/SL/SH trends depend on
+        every row above. The latency is therefore at least that of the largest zone,
+        which generate_unique_zone_percentages makes 30-60% of the profile: the
+        speedup is at most about 2-3x and needs no more than five workers.
+
+        The pool is created on the first call and reused by later ones; pass an
+        executor to use your own instead.
+        """
+        zones = self.assign_depths_to_zones(depth_choice, zone_percentages)
+        jobs = [(self.custom_ranges, f"{seed}/{i}", block, depth_choice[-1], zones, base_type, env_type)
+                for i, block in enumerate(self.split_blocks(depth_choice, zones))]
+
+        if executor is None:
+            workers = workers or min(len(jobs), os.cpu_count() or 1)
+        pool = executor or _shared_pool(workers)
+        try:
+            # Largest zones first, so a pool with fewer workers than zones finishes sooner
+            futures = {i: pool.submit(_generate_block, jobs[i])
+                       for i in sorted(range(len(jobs)), key=lambda i: -len(jobs[i][2]))}
+            parts = [futures[i].result() for i in range(len(jobs))]  # Back in depth order
+        except BrokenProcessPool:
+            if executor is None:
+                with _pools_lock:
+                    _pools.pop(workers, None)  # The next call starts a fresh pool
+            raise
+        return [row for part in parts for row in part]
+
+    def init_stagnant_state(self, ranges):
+        """Draws the stagnant centres of the SL/SH parameters in `ranges`, if not set yet.
+
+        generate_profile sets a centre at the first row above the profile's midpoint.
+        A zone generated on its own below the midpoint never sees such a row, so
+        generate_profile_parallel sets the centres before the zone's first row.
+        """
+        for param, (min_val, max_val, trend) in ranges.items():
+            if trend not in ("SL", "SH"):
+                continue
+            key = "" if param in PARAMETERS[:6] else param  # generate_sum_to_100 keeps its state under ""
+            name = f'{key}_stagnant_center_{trend.lower()}'
+            if not hasattr(self, name):
+                setattr(self, name, self.rng.uniform(min_val * 1.2, max_val * 0.8))
+
+    def reset_trend_state(self):
+        """Forgets the values carried over between rows by the stateful trends."""
+        for name in list(vars(self)):
+            if name.endswith(TREND_STATE_SUFFIXES):
+                delattr(self, name)
+
+    def generate_seeded_profile(self, seed, depth_choice, base_type, env_type):
+        """Generates a reproducible profile (zone split included) from a seed."""
+        self.rng.seed(f"zones-{seed}")  # Zone split gets its own stream, separate from the rows
+        zone_percentages = self.generate_unique_zone_percentages()
+        zones = self.assign_depths_to_zones(depth_choice, zone_percentages)
+        data = self.generate_profile(depth_choice, zone_percentages, base_type, env_type, seed=seed)
+        return {
+            "seed": seed,
+            "base_type": base_type,
+            "env_type": env_type,
+            "zone_percentages": zone_percentages,
+            "zones": zones,
+            "data": data,
+        }
+
+    def generate_batch(self, count, depth_choice, base_type, env_type, seed=0):
+        """Yields `count` seeded profiles one at a time (seeds seed, seed+1, ...)."""
+        for i in range(count):
+            yield self.generate_seeded_profile(seed + i, depth_choice, base_type, env_type)
+
     def generate_sum_to_100(self, min1, max1, trend1, min2, max2, trend2, min3, max3, trend3, d, depth):
         """Generates three values that sum to 100, respecting bounds and trends."""
         max_attempts = 100
@@ -234,6 +387,10 @@ class ProfileGenerator:
         return round(v1, 2), round(v2, 2), round(100 - v1 - v2, 2)
 
 
+    def compile_ranges(self, base_type, env_type):
+        """Returns the effective range table {zone: ranges} of a scenario, custom ranges included."""
+        return {zone: self.get_parameter_ranges(base_type, env_type, zone) for zone in self.zones}
+
     def get_parameter_ranges(self, base_type, env_type, zone_num):
         """Gets parameter ranges, considering custom overrides."""
 
@@ -559,8 +716,12 @@ class ProfileGenerator:
 
         return ranges
 
-    def generate_diagram(self, data):
-        """Generates the Matplotlib diagram."""
+    def generate_diagram(self, data, fig=None):
+        """Generates the Matplotlib diagram.
+
+        Pass a bare matplotlib.figure.Figure to draw without pyplot, e.g. from a
+        background thread; such a figure needs no plt.close().
+        """
         if not data:
             return None
 
@@ -568,11 +729,21 @@ class ProfileGenerator:
         df = df.set_index('Depth')
         df = df.drop('Zone', axis=1)
 
-        fig, axes = plt.subplots(nrows=1, ncols=len(df.columns), figsize=(10, 6), sharey=True)
+        if fig is None:
+            fig, axes = plt.subplots(nrows=1, ncols=len(df.columns), figsize=(10, 6), sharey=True)
+        else:
+            axes = fig.subplots(nrows=1, ncols=len(df.columns), sharey=True)
 
         if len(df.columns) == 1:
             axes = [axes]  # Ensure axes is always a list
 
+        self.plot_panels(axes, df)
+
+        fig.subplots_adjust(wspace=0.1)
+        return fig  # Correctly return the figure object
+
+    def plot_panels(self, axes, df):
+        """Draws one stepped depth panel per column of a Depth-indexed DataFrame."""
         for ax, col in zip(axes, df.columns):
             ax.step(df[col], df.index, where='post')
             ax.set_title(col, fontsize=9, rotation=0, ha='center')
@@ -581,5 +752,28 @@ class ProfileGenerator:
             ax.tick_params(axis='both', which='minor', labelsize=4)
             ax.set_ylim(df.index.max(), 0)
 
+    def generate_envelope_diagram(self, aggregator, outer=(0.05, 0.95), inner=(0.25, 0.75)):
+        """Generates the Matplotlib envelope diagram (median and quantile bands) of an ensemble."""
+        if aggregator.count == 0:
+            return None
+
+        stats = aggregator.summary(quantiles=outer + inner + (0.5,))
+        depths = aggregator.depths
+
+        fig, axes = plt.subplots(nrows=1, ncols=len(aggregator.parameters), figsize=(10, 6), sharey=True)
+
+        if len(aggregator.parameters) == 1:
+            axes = [axes]  # Ensure axes is always a list
+
+        for ax, param in zip(axes, aggregator.parameters):
+            ax.fill_betweenx(depths, stats[param][outer[0]], stats[param][outer[1]], step='post', alpha=0.25, linewidth=0)
+            ax.fill_betweenx(depths, stats[param][inner[0]], stats[param][inner[1]], step='post', alpha=0.45, linewidth=0)
+            ax.step(stats[param][0.5], depths, where='post', linewidth=0.8)
+            ax.set_title(param, fontsize=9, rotation=0, ha='center')
+            ax.tick_params(axis='both', which='major', labelsize=6)
+            ax.tick_params(axis='both', which='minor', labelsize=4)
+            ax.set_ylim(depths.max(), 0)
+
+        fig.suptitle(f"Ensemble of {aggregator.count} profiles", fontsize=9)
         fig.subplots_adjust(wspace=0.1)
-        return fig  # Correctly return the figure object
+        return fig
@@ -0,0 +1,89 @@
+# profile_pool.py
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from session_store import ProfileHandle
+
+DEFAULT_POOL_SIZE = int(os.environ.get("PPR_PREFETCH_SIZE", 3))
+DEFAULT_CPU_BUDGET = float(os.environ.get("PPR_PREFETCH_CPU", 0.25))  # Fraction of one core
+
+
+class ProfilePool:
+    """
+    Background producer keeping a few ready, seeded profiles per selected scenario.
+
+    A scenario is a ProfileHandle template (seed None) carrying the depth range, base
+    type, env type and custom ranges. The producer thread generates profiles for the
+    most recently selected scenarios into the shared ProfileStore, with their diagram
+    already rendered, and keeps only the handles. After each item it sleeps long
+    enough to stay under `cpu_budget` of one core.
+    """
+
+    def __init__(self, store, size=DEFAULT_POOL_SIZE, cpu_budget=DEFAULT_CPU_BUDGET, max_scenarios=4):
+        self.store = store
+        self.size = size
+        self.cpu_budget = cpu_budget
+        self.max_scenarios = max_scenarios
+        self.pools = OrderedDict()  # scenario key -> (template, deque of ready handles)
+        self.condition = threading.Condition()
+        self.thread = None
+
+    @staticmethod
+    def scenario_key(template):
+        return template.key[1:]  # Everything but the seed
+
+    def select(self, template):
+        """Marks a scenario as the one to keep filled and wakes the producer."""
+        key = self.scenario_key(template)
+        with self.condition:
+            if key not in self.pools:
+                self.pools[key] = (template, deque())
+            self.pools.move_to_end(key)
+            while len(self.pools) > self.max_scenarios:
+                self.pools.popitem(last=False)  # Forget scenarios nobody has selected lately
+            self.condition.notify()
+        self._start()
+
+    def pop(self, template):
+        """Returns a ready handle for the scenario, or None if none is ready yet."""
+        with self.condition:
+            entry = self.pools.get(self.scenario_key(template))
+            handle = entry[1].popleft() if entry and entry[1] else None
+            self.condition.notify()  # Refill
+        return handle
+
+    def _start(self):
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._produce, name="profile-prefetch", daemon=True)
+                self.thread.start()
+
+    def _next_template(self):
+        """Newest selected scenario that still has room in its pool."""
+        for template, ready in reversed(self.pools.values()):
+            if len(ready) < self.size:
+                return template
+        return None
+
+    def _produce(self):
+        while True:
+            with self.condition:
+                template = self._next_template()
+                while template is None:
+                    self.condition.wait()
+                    template = self._next_template()
+
+            started = time.thread_time()
+            handle = ProfileHandle(random.randrange(2**31), template.depth_range, template.base_type,
+                                   template.env_type, template.custom_ranges)
+            self.store.profile(handle)
+            self.store.artifact(handle, "png")  # Diagram ready before the click
+            spent = time.thread_time() - started
+
+            with self.condition:
+                entry = self.pools.get(self.scenario_key(template))
+                if entry is not None:
+                    entry[1].append(handle)
+            time.sleep(max(0.0, spent * (1 / self.cpu_budget - 1)))  # Stay within the CPU budget
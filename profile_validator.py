@@ -0,0 +1,131 @@
+# profile_validator.py
+import numpy as np
+from profile_generator import ProfileGenerator, BASE_TYPES, ENV_TYPES, PARAMETERS, COLUMNS
+
+RULES = ["lof_sum", "grain_size_sum", "range", "zone_contiguity", "trend_monotonic"]
+TREND_CODES = {"UP": 1, "DN": -1}  # Trends whose values must be monotone within a zone
+
+
+class ValidationReport:
+    """Violation counts and (capped) locations per rule."""
+
+    def __init__(self, max_locations=1000):
+        self.max_locations = max_locations
+        self.counts = {rule: 0 for rule in RULES}
+        self.locations = {rule: [] for rule in RULES}
+
+    def add(self, rule, mask, profile_offset=0):
+        """Records the violations flagged in a boolean mask whose first axis is the profile."""
+        count = int(mask.sum())
+        if count == 0:
+            return
+        self.counts[rule] += count
+        room = self.max_locations - sum(len(loc) for loc in self.locations[rule])
+        if room > 0:
+            found = np.argwhere(mask)[:room]
+            found[:, 0] += profile_offset
+            self.locations[rule].append(found)
+
+    @property
+    def ok(self):
+        return not any(self.counts.values())
+
+    def location_array(self, rule):
+        """Returns the recorded locations of a rule as an int array of index rows."""
+        if not self.locations[rule]:
+            return np.empty((0, 3 if rule in ("range", "trend_monotonic") else 2), dtype=np.int64)
+        return np.concatenate(self.locations[rule])
+
+    def summary(self):
+        """Returns {rule: count}."""
+        return dict(self.counts)
+
+
+class ProfileValidator:
+    """
+    Checks generated profiles against their contract with array operations.
+
+    Works on columnar blocks of shape (profiles, COLUMNS, depths), such as an
+    EnsembleStore, with NaN marking padding rows. The rules are:
+    OM+CC+IM and Clay+Silt+Sand sum to 100 (rows where all three are 0 are exempt,
+    as generate_data writes those when a zone has no range), every parameter stays
+    inside its zone's range, zones form contiguous, top-down blocks, and UP/DN
+    parameters are monotone within each zone. Locations are (profile, depth index)
+    or, for per-parameter rules, (profile, parameter index into PARAMETERS, depth index).
+    """
+
+    def __init__(self, generator=None, tolerance=0.01, columns=COLUMNS):
+        generator = generator or ProfileGenerator()  # Pass one to validate against custom ranges
+        self.tolerance = tolerance
+        self.column_index = {col: i for i, col in enumerate(columns)}
+        self.param_cols = [self.column_index[param] for param in PARAMETERS]
+
+        # Range table lookup arrays indexed by (base_type, env_type, zone, parameter); zone 0 means no zone
+        shape = (len(BASE_TYPES), len(ENV_TYPES), len(generator.zones) + 1, len(PARAMETERS))
+        self.lower = np.zeros(shape)
+        self.upper = np.zeros(shape)
+        self.trend = np.zeros(shape, dtype=np.int8)
+        for b, base_type in enumerate(BASE_TYPES):
+            for e, env_type in enumerate(ENV_TYPES):
+                for zone, ranges in generator.compile_ranges(base_type, env_type).items():
+                    for k, param in enumerate(PARAMETERS):
+                        if param in ranges:
+                            min_val, max_val, trend = ranges[param]
+                            self.lower[b, e, zone, k] = min_val
+                            self.upper[b, e, zone, k] = max_val
+                            self.trend[b, e, zone, k] = TREND_CODES.get(trend, 0)
+
+    def validate(self, values, base_idx, env_idx, report=None, profile_offset=0):
+        """Validates a (profiles, columns, depths) block; base_idx/env_idx give each profile's scenario."""
+        report = report or ValidationReport()
+        values = np.asarray(values, dtype=float)
+        base_idx = np.asarray(base_idx)[:, None]
+        env_idx = np.asarray(env_idx)[:, None]
+        tol = self.tolerance
+
+        padding = np.isnan(values[:, self.column_index["Depth"], :])
+        zone = np.nan_to_num(values[:, self.column_index["Zone"], :], nan=0).astype(np.int64)
+        params = values[:, self.param_cols, :]
+
+        for rule, parts in (("lof_sum", ("OM", "CC", "IM")), ("grain_size_sum", ("Clay", "Silt", "Sand"))):
+            block = values[:, [self.column_index[p] for p in parts], :]
+            total = block.sum(axis=1)
+            all_zero = np.all(block == 0, axis=1)
+            report.add(rule, ~padding & ~all_zero & (np.abs(total - 100) > tol), profile_offset)
+
+        # Gather each row's zone limits: (profiles, depths, params) -> (profiles, params, depths)
+        lower = self.lower[base_idx, env_idx, zone].transpose(0, 2, 1)
+        upper = self.upper[base_idx, env_idx, zone].transpose(0, 2, 1)
+        outside = (params < lower - tol) | (params > upper + tol)
+        report.add("range", ~padding[:, None, :] & outside, profile_offset)
+
+        # Zones must run top-down without gaps: no unzoned rows and no step back to a lower zone number
+        pairs = ~padding[:, 1:] & ~padding[:, :-1]
+        stepped_back = np.zeros_like(padding)
+        stepped_back[:, 1:] = pairs & (np.diff(zone, axis=1) < 0)
+        report.add("zone_contiguity", ~padding & ((zone == 0) | stepped_back), profile_offset)
+
+        trend = self.trend[base_idx, env_idx, zone].transpose(0, 2, 1)[:, :, 1:]
+        step = np.diff(params, axis=2)
+        same_zone = (pairs & (zone[:, 1:] == zone[:, :-1]))[:, None, :]
+        broken = ((trend == 1) & (step < -tol)) | ((trend == -1) & (step > tol))
+        not_monotone = np.zeros(params.shape, dtype=bool)
+        not_monotone[:, :, 1:] = same_zone & broken
+        report.add("trend_monotonic", not_monotone, profile_offset)
+        return report
+
+    def validate_records(self, data, base_type, env_type):
+        """Validates one profile given as the row dicts from generate_profile."""
+        columns = sorted(self.column_index, key=self.column_index.get)
+        block = np.array([[[np.nan if row[col] is None else row[col] for row in data] for col in columns]], dtype=float)
+        return self.validate(block, [BASE_TYPES.index(base_type)], [ENV_TYPES.index(env_type)])
+
+    def validate_store(self, store, chunk=1024):
+        """Validates an EnsembleStore chunk by chunk, so memory stays bounded by the chunk size."""
+        report = ValidationReport()
+        for start in range(0, len(store), chunk):
+            stop = min(start + chunk, len(store))
+            block = store.decode(store.values[start:stop])
+            self.validate(block, store.profiles["base_type"][start:stop], store.profiles["env_type"][start:stop],
+                          report=report, profile_offset=start)
+        return report
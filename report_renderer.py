@@ -0,0 +1,127 @@
+# report_renderer.py
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+from profile_generator import ProfileGenerator
+
+FIGSIZE = (10, 6)  # Same page size as generate_diagram
+
+# Per-worker state, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(store_path):
+    """Opens the ensemble store (if any) once per worker process."""
+    from ensemble_store import EnsembleStore  # Only needed when rendering from a store
+    _worker["generator"] = ProfileGenerator()
+    _worker["pages"] = {}  # Panel columns -> (figure, axes, step lines, title) reused for every page
+    _worker["store"] = EnsembleStore(store_path) if store_path else None
+
+
+def _page(df):
+    """Returns the worker's figure for the panels of `df`, built with generate_diagram's layout once."""
+    pages = _worker.setdefault("pages", {})
+    columns = tuple(df.columns)
+    if columns not in pages:
+        # A bare Figure, never registered with pyplot, so it can live as long as the worker
+        fig = Figure(figsize=FIGSIZE)
+        axes = fig.subplots(nrows=1, ncols=len(columns), sharey=True, squeeze=False)[0]
+        _worker.setdefault("generator", ProfileGenerator()).plot_panels(axes, df)
+        fig.subplots_adjust(wspace=0.1)
+        pages[columns] = (fig, axes, [ax.get_lines()[0] for ax in axes], fig.suptitle("", fontsize=9))
+    return pages[columns]
+
+
+def _build_page(job):
+    """Draws one profile diagram into the worker's reused figure and returns the figure."""
+    store = _worker.get("store")
+    if job["profile"] is None:
+        data, meta = store.to_records(job["index"]), store.metadata(job["index"])
+    else:
+        profile = job["profile"]
+        data, meta = (profile["data"], profile) if isinstance(profile, dict) else (profile, {})
+
+    df = pd.DataFrame(data).set_index('Depth').drop('Zone', axis=1)
+    fig, axes, lines, title = _page(df)
+    for ax, line, col in zip(axes, lines, df.columns):
+        line.set_data(df[col], df.index)  # Only the step data changes between pages
+        ax.relim()
+        ax.autoscale_view(scaley=False)
+    axes[0].set_ylim(df.index.max(), 0)  # Shared by every panel
+    title.set_text(f"{meta['base_type']} / {meta['env_type']} - seed {meta['seed']}" if "seed" in meta else "")
+    return fig
+
+
+def _render_page(job):
+    """Writes one profile diagram to job["path"] as PNG or SVG."""
+    _build_page(job).savefig(job["path"], format=job["format"], dpi=job["dpi"])
+    return job["path"]
+
+
+def _render_chunk(chunk):
+    """Writes a contiguous run of pages into one vector PDF at chunk["path"]."""
+    with PdfPages(chunk["path"]) as pdf:
+        for job in chunk["jobs"]:
+            pdf.savefig(_build_page(job))
+    return chunk["path"]
+
+
+def render_report(output, profiles=None, store_path=None, fmt="pdf", workers=None, dpi=150):
+    """
+    Renders many profile diagrams across a process pool.
+
+    `profiles` is a list of generate_profile rows or generate_seeded_profile dicts;
+    alternatively `store_path` names an EnsembleStore, which each worker maps itself
+    so profile data is never pickled. With fmt "png" or "svg" every page is written
+    by its worker to `output` (a directory). With fmt "pdf" each worker writes a
+    vector PDF for a contiguous run of pages and the runs are joined, in order,
+    into `output` with pypdf; joining only copies page objects, so nearly all the
+    work stays in the workers. Returns the number of pages.
+    """
+    if (profiles is None) == (store_path is None):
+        raise ValueError("Pass either profiles or store_path.")
+    if fmt not in ("pdf", "png", "svg"):
+        raise ValueError(f"Unknown report format: {fmt}")
+
+    if store_path:
+        from ensemble_store import EnsembleStore
+        count = len(EnsembleStore(store_path))
+    else:
+        count = len(profiles)
+
+    workers = workers or os.cpu_count() or 1
+    jobs = [{
+        "index": i,
+        "profile": profiles[i] if profiles is not None else None,
+        "path": os.path.join(output, f"profile_{i + 1:05d}.{fmt}") if fmt != "pdf" else None,
+        "format": fmt,
+        "dpi": dpi,
+    } for i in range(count)]
+
+    if fmt != "pdf":
+        os.makedirs(output, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store_path,)) as pool:
+            return sum(1 for _ in pool.map(_render_page, jobs, chunksize=max(1, count // (4 * workers))))
+
+    from pypdf import PdfWriter  # Only needed to join the PDF chunks
+
+    tmp_dir = tempfile.mkdtemp(prefix="ppr_report_")
+    try:
+        size = max(1, -(-count // (4 * workers)))  # A few chunks per worker to balance the load
+        chunks = [{"path": os.path.join(tmp_dir, f"chunk_{i:05d}.pdf"), "jobs": jobs[start:start + size]}
+                  for i, start in enumerate(range(0, count, size))]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store_path,)) as pool:
+            paths = list(pool.map(_render_chunk, chunks))
+
+        writer = PdfWriter()
+        for path in paths:
+            writer.append(path)
+        with open(output, "wb") as f:
+            writer.write(f)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return count
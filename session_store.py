@@ -0,0 +1,120 @@
+# session_store.py
+import io
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+from matplotlib.figure import Figure
+from profile_generator import ProfileGenerator
+from compact_values import CompactProfile
+
+DEFAULT_BUDGET_MB = float(os.environ.get("PPR_STORE_BUDGET_MB", 256))
+
+ARTIFACT_FORMATS = ["csv", "xlsx", "png", "svg"]
+
+
+class ProfileHandle:
+    """
+    Lightweight reference to a generated profile, kept in a session instead of the data.
+
+    It holds everything needed to regenerate the profile: seed, depth range, scenario
+    and the custom ranges that were active when it was generated.
+    """
+
+    def __init__(self, seed, depth_range, base_type, env_type, custom_ranges=None):
+        self.seed = seed
+        self.depth_range = tuple(depth_range)  # (min_depth, max_depth), 2 cm steps
+        self.base_type = base_type
+        self.env_type = env_type
+        self.custom_ranges = dict(custom_ranges or {})
+
+    @property
+    def key(self):
+        return (self.seed, self.depth_range, self.base_type, self.env_type, repr(sorted(self.custom_ranges.items())))
+
+    def depth_choice(self):
+        return list(range(self.depth_range[0], self.depth_range[1] + 1, 2))
+
+    def generate(self, cache=None):
+        """Regenerates the profile rows from the recipe, through the persistent cache if given."""
+        generator = ProfileGenerator(cache=cache)
+        generator.custom_ranges = dict(self.custom_ranges)
+        return generator.generate_seeded_profile(self.seed, self.depth_choice(), self.base_type, self.env_type)["data"]
+
+
+def render_artifact(data, fmt):
+    """Renders a profile into downloadable bytes (csv, xlsx, png or svg)."""
+    if fmt == "csv":
+        return pd.DataFrame(data).to_csv(index=False).encode('utf-8')
+    buf = io.BytesIO()
+    if fmt == "xlsx":
+        with pd.ExcelWriter(buf, engine='openpyxl') as writer:
+            pd.DataFrame(data).to_excel(writer, index=False, sheet_name='Profile Data')
+    elif fmt in ("png", "svg"):
+        # A bare Figure keeps pyplot's global figure manager out of it, so this is safe from any thread
+        fig = ProfileGenerator().generate_diagram(data, fig=Figure(figsize=(10, 6)))
+        fig.savefig(buf, format=fmt)
+    else:
+        raise ValueError(f"Unknown artifact format: {fmt}")
+    return buf.getvalue()
+
+
+class ProfileStore:
+    """
+    Process-wide, size-aware LRU store for generated profiles and rendered artifacts.
+
+    Profiles are kept in their fixed-point compact form and artifacts as bytes. When
+    the total size exceeds the budget the least recently used entries are evicted;
+    a later request for an evicted entry regenerates it from its handle's seed.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, cache=None):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.cache = cache  # Optional ProfileCache checked before generating
+        self.size = 0
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def _put(self, key, value, size):
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.budget and len(self.entries) > 1:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def profile(self, handle):
+        """Returns the CompactProfile of a handle, regenerating it if it was evicted."""
+        key = ("profile", handle.key)
+        compact = self._get(key)
+        if compact is None:
+            compact = CompactProfile.from_records(handle.generate(self.cache))
+            self._put(key, compact, compact.nbytes)
+        return compact
+
+    def records(self, handle):
+        """Returns the profile rows of a handle as generate_profile would."""
+        return self.profile(handle).to_records()
+
+    def artifact(self, handle, fmt):
+        """Returns the rendered bytes of a handle in one of ARTIFACT_FORMATS."""
+        key = (fmt, handle.key)
+        blob = self._get(key)
+        if blob is None:
+            blob = render_artifact(self.records(handle), fmt)
+            self._put(key, blob, len(blob))
+        return blob
+
+    def stats(self):
+        """Returns entry count, bytes used and the budget."""
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "budget": self.budget}
@@ -1,11 +1,14 @@
 # app.py
 import streamlit as st
 from profile_generator import ProfileGenerator
+from interactive_chart import chart_data, chart_spec
+from session_store import ProfileStore, ProfileHandle
+from profile_pool import ProfilePool
+from profile_cache import ProfileCache
 import pandas as pd
 import matplotlib.pyplot as plt
 import openpyxl
 import random
-import io
 import os
 
 # Set Streamlit page configuration
@@ -54,32 +57,27 @@ Data generation is not purely random. Values follow trends (increasing, decreasi
     # Footer (remains the same)
     st.markdown("---")
 
+@st.cache_resource
+def get_profile_store():
+    """One profile store shared by every session of this server process."""
+    return ProfileStore(cache=ProfileCache())
+
+@st.cache_resource
+def get_profile_pool():
+    """Background prefetch pool shared by every session, filling the shared profile store."""
+    return ProfilePool(get_profile_store())
+
 # profile_generation_page() function in app.py
 
 def profile_generation_page():
     st.title("Profile Generation")
 
     profile_generator = ProfileGenerator()
+    profile_store = get_profile_store()
 
     # --- Sidebar for Input ---
     st.sidebar.header("Input Parameters")
 
-    # --- Generate Profile Button ---
-    if st.sidebar.button("Generate"):
-        with st.spinner("Generating profile..."):
-            zone_percentages = profile_generator.generate_unique_zone_percentages()  # Call the method
-            data = profile_generator.generate_profile(depth_choice, zone_percentages, base_type, env_type) # Pass zone_percentages
-            if data:
-                st.session_state.data = data  # Store data in session state
-                df = pd.DataFrame(data)
-                st.dataframe(df.style.format("{:.0f}"))  # Format to 0 decimal places
-
-                # --- Display Diagram ---
-                fig = profile_generator.generate_diagram(data)
-                st.pyplot(fig)
-            else:
-                st.warning("No data generated. Please check your input parameters.")
-
     # Depth Selection
     min_depth = st.sidebar.number_input("Minimum Depth", min_value=0, max_value=1000, value=0, step=1)
     max_depth = st.sidebar.number_input("Maximum Depth", min_value=0, max_value=1000, value=1000, step=1)
@@ -88,7 +86,6 @@ def profile_generation_page():
           st.sidebar.error("Maximum depth must be greater than minimum depth.")
           return  # Exit the function if depth is invalid
 
-    depth_choice = list(range(min_depth, max_depth + 1, 2)) # Define depth_choice
     num_zones = len(profile_generator.zones) # Get num_zones dynamically
 
         # Base Type Selection
@@ -99,10 +96,42 @@ def profile_generation_page():
     env_type = st.sidebar.selectbox("Choose an environment type:",
                                         options=["Lake", "Peatland", "Wetland"])
 
+    # Diagram mode: interactive charts render in the browser, static ones are rasterized on the server
+    diagram_mode = st.sidebar.radio("Diagram mode:", options=["Interactive", "Static"])
+
+    # Prefetch: keep a few profiles of the selected scenario ready in the background
+    prefetch = st.sidebar.checkbox("Prefetch profiles", value=False)
+    scenario = ProfileHandle(None, (min_depth, max_depth), base_type, env_type, profile_generator.custom_ranges)
+    if prefetch:
+        get_profile_pool().select(scenario)
+
+    # --- Generate Profile Button ---
+    if st.sidebar.button("Generate"):
+        with st.spinner("Generating profile..."):
+            # Sessions keep only a handle; the shared store holds the data and regenerates it from the seed if evicted
+            handle = get_profile_pool().pop(scenario) if prefetch else None
+            if handle is None:
+                handle = ProfileHandle(random.randrange(2**31), (min_depth, max_depth), base_type, env_type,
+                                       profile_generator.custom_ranges)
+            data = profile_store.records(handle)
+            if data:
+                st.session_state.profile_handle = handle  # Store the handle in session state
+                df = pd.DataFrame(data)
+                st.dataframe(df.style.format("{:.0f}"))  # Format to 0 decimal places
+
+                # --- Display Diagram ---
+                if diagram_mode == "Interactive":
+                    chart_df = chart_data(data)
+                    st.vega_lite_chart(chart_df, chart_spec(chart_df.columns.drop("Depth")))
+                else:
+                    st.image(profile_store.artifact(handle, "png"))  # Pre-rendered when prefetched
+            else:
+                st.warning("No data generated. Please check your input parameters.")
+
 # --- Advanced Parameter Adjustment (Sliders and Dropdowns) ---
     st.sidebar.header("Advanced Parameter Adjustment")
 
-    if 'data' in st.session_state:  # Only show if data has been generated
+    if 'profile_handle' in st.session_state:  # Only show if data has been generated
         selected_zone_index = st.sidebar.selectbox("Select Zone:", options=list(range(1, num_zones + 1)))
         selected_zone = selected_zone_index  # Corrected zone selection
 
@@ -138,57 +167,39 @@ def profile_generation_page():
             st.sidebar.success("Custom ranges applied!")
 
        # --- Save Data ---
-    if 'data' in st.session_state and st.session_state.data:
+    if 'profile_handle' in st.session_state:
+        handle = st.session_state.profile_handle
         st.sidebar.header("Save Data")
-        df_download = pd.DataFrame(st.session_state.data)
 
         # CSV download
-        csv = df_download.to_csv(index=False).encode('utf-8')
         st.sidebar.download_button(
             label="Download data as CSV",
-            data=csv,
+            data=profile_store.artifact(handle, "csv"),
             file_name='paleo_profile.csv',
             mime='text/csv',
         )
 
         # Excel (xlsx) download.  Requires openpyxl.
-        excel_buffer = io.BytesIO()  # Use BytesIO
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df_download.to_excel(writer, index=False, sheet_name='Profile Data')
-        excel_buffer.seek(0)  # Rewind the buffer to the beginning
         st.sidebar.download_button(
             label="Download data as Excel",
-            data=excel_buffer,
+            data=profile_store.artifact(handle, "xlsx"),
             file_name='paleo_profile.xlsx',
             mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         )
         # Save Diagram
-        if 'data' in st.session_state and st.session_state.data:
-                st.sidebar.header("Save Diagram")
-                # Generate the diagram
-                fig = profile_generator.generate_diagram(st.session_state.data)
-
-                # Save diagram as PNG
-                buf_png = io.BytesIO()
-                fig.savefig(buf_png, format="png")
-                buf_png.seek(0)
-                st.sidebar.download_button(
-                    label="Download Diagram as PNG",
-                    data=buf_png,
-                    file_name="paleo_profile_diagram.png",
-                    mime="image/png",
-                )
-
-                # Save diagram as SVG
-                buf_svg = io.BytesIO()
-                fig.savefig(buf_svg, format="svg")
-                buf_svg.seek(0)
-                st.sidebar.download_button(
-                    label="Download Diagram as SVG",
-                    data=buf_svg,
-                    file_name="paleo_profile_diagram.svg",
-                    mime="image/svg+xml",
-                )
+        st.sidebar.header("Save Diagram")
+        st.sidebar.download_button(
+            label="Download Diagram as PNG",
+            data=lambda: profile_store.artifact(handle, "png"),  # Rendered only when clicked
+            file_name="paleo_profile_diagram.png",
+            mime="image/png",
+        )
+        st.sidebar.download_button(
+            label="Download Diagram as SVG",
+            data=lambda: profile_store.artifact(handle, "svg"),  # Rendered only when clicked
+            file_name="paleo_profile_diagram.svg",
+            mime="image/svg+xml",
+        )
             
 def main():
     """Main function to handle page navigation."""
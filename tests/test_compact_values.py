@@ -0,0 +1,59 @@
+# test_compact_values.py
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import ProfileGenerator, BASE_TYPES, ENV_TYPES
+from compact_values import CompactProfile, fixed_dtype, to_fixed, from_fixed, missing_value
+
+DEPTH_CHOICE = list(range(0, 301, 2))
+
+
+@pytest.mark.parametrize("base_type", BASE_TYPES)
+@pytest.mark.parametrize("env_type", ENV_TYPES)
+def test_generated_profiles_round_trip_exactly(base_type, env_type):
+    generator = ProfileGenerator()
+    for seed in range(5):
+        data = generator.generate_seeded_profile(seed, DEPTH_CHOICE, base_type, env_type)["data"]
+        compact = CompactProfile.from_records(data)
+        assert compact.to_records() == data
+
+        buf = io.BytesIO()
+        compact.save(buf)
+        buf.seek(0)
+        assert CompactProfile.load(buf).to_records() == data
+
+
+def test_rows_outside_every_zone_round_trip():
+    data = ProfileGenerator().generate_profile(list(range(100, 161, 2)), [20, 20, 20, 20, 20], "Rock", "Lake", seed=1)
+    assert any(row["Zone"] is None for row in data)  # The zone split covers 0..62 only
+    assert CompactProfile.from_records(data).to_records() == data
+
+
+def test_nan_is_the_missing_marker():
+    fixed = to_fixed([1.5, np.nan, -2.25], np.int32)
+    assert fixed.tolist() == [150, missing_value(np.int32), -225]
+    values = from_fixed(fixed)
+    assert values[0] == 1.5 and np.isnan(values[1]) and values[2] == -2.25
+
+
+def test_int16_int32_boundary():
+    assert fixed_dtype([327.66, -327.66]) == np.int16
+    assert fixed_dtype([327.67]) == np.int32
+    assert fixed_dtype([np.nan]) == np.int16
+    assert from_fixed(to_fixed([327.66, -327.66])).tolist() == [327.66, -327.66]
+    assert from_fixed(to_fixed([327.67, 1400.5])).tolist() == [327.67, 1400.5]
+    with pytest.raises(OverflowError):
+        to_fixed([327.68], np.int16)
+    with pytest.raises(OverflowError):
+        to_fixed([-327.68], np.int16)  # Would collide with the missing marker
+
+
+def test_more_than_two_decimals_is_rejected():
+    with pytest.raises(ValueError):
+        to_fixed([1.234])
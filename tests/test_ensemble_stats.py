@@ -0,0 +1,55 @@
+# test_ensemble_stats.py
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ensemble_stats import EnsembleAggregator, DEFAULT_QUANTILES
+
+DEPTH_CHOICE = [0, 2, 4]
+PARAMETERS = ["Ca", "MS", "OM"]
+BUCKET_WIDTH = np.exp(2 * np.log(1e5 / 0.01) / 1024) - 1  # Relative error bound with the defaults
+
+
+def _profiles(count=2000):
+    rng = np.random.default_rng(0)
+    return np.round(rng.lognormal(mean=4, sigma=1, size=(count, len(PARAMETERS), len(DEPTH_CHOICE))), 2)
+
+
+def _aggregate(profiles):
+    aggregator = EnsembleAggregator(DEPTH_CHOICE, parameters=PARAMETERS)
+    for values in profiles:
+        aggregator.update_array(values)
+    return aggregator
+
+
+def test_merged_halves_match_one_aggregator():
+    profiles = _profiles()
+    whole = _aggregate(profiles)
+    merged = _aggregate(profiles[:1000]).merge(_aggregate(profiles[1000:]))
+    assert merged.count == whole.count
+    assert np.array_equal(merged.histogram, whole.histogram)
+    assert np.array_equal(merged.min, whole.min) and np.array_equal(merged.max, whole.max)
+    assert np.allclose(merged.mean, whole.mean) and np.allclose(merged.variance(), whole.variance())
+    for q in DEFAULT_QUANTILES:
+        assert np.array_equal(merged.quantile(q), whole.quantile(q))
+
+
+def test_quantiles_within_one_bucket_width():
+    profiles = _profiles()
+    aggregator = _aggregate(profiles)
+    assert np.allclose(aggregator.mean, profiles.mean(axis=0))
+    assert np.allclose(aggregator.variance(), profiles.var(axis=0, ddof=1))
+    for q in DEFAULT_QUANTILES:
+        exact = np.quantile(profiles, q, axis=0, method="inverted_cdf")
+        assert np.all(np.abs(aggregator.quantile(q) - exact) <= BUCKET_WIDTH * np.abs(exact) + 0.01)
+
+
+def test_values_beyond_max_abs_are_counted():
+    aggregator = EnsembleAggregator(DEPTH_CHOICE, parameters=PARAMETERS, max_abs=100)
+    aggregator.update_array(np.full((3, 3), 50.0))
+    aggregator.update_array(np.full((3, 3), 500.0))
+    assert aggregator.clamped.tolist() == [[1, 1, 1]] * 3
+    assert np.all(aggregator.clamped_fraction() == 0.5)
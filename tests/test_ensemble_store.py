@@ -0,0 +1,77 @@
+# test_ensemble_store.py
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import ProfileGenerator, COLUMNS
+from ensemble_store import EnsembleStore, VALUES_FILE
+
+DEPTH_CHOICE = list(range(0, 101, 2))
+
+
+def _profiles():
+    """Two full profiles and one shorter one, to exercise the padding."""
+    generator = ProfileGenerator()
+    profiles = list(generator.generate_batch(2, DEPTH_CHOICE, "Paleosol", "Wetland", seed=5))
+    profiles.append(generator.generate_seeded_profile(9, DEPTH_CHOICE[:20], "Rock", "Lake"))
+    return profiles
+
+
+@pytest.fixture(params=["float64", "int32"])
+def store(request, tmp_path):
+    store = EnsembleStore.create(str(tmp_path / "store"), capacity=4, n_depths=len(DEPTH_CHOICE), dtype=request.param)
+    for profile in _profiles():
+        store.append(profile)
+    store.flush()
+    return store
+
+
+def test_profiles_round_trip_after_reopening(store):
+    reopened = EnsembleStore(store.path)
+    assert len(reopened) == 3
+    assert reopened.header == store.header
+    for index, profile in enumerate(_profiles()):
+        assert reopened.to_records(index) == profile["data"]
+        meta = reopened.metadata(index)
+        expected = {key: profile[key] for key in ("seed", "base_type", "env_type", "zones")}
+        assert meta == {**expected, "n_depths": len(profile["data"])}
+
+
+def test_slices_are_views_of_the_mapped_file(store):
+    column = COLUMNS.index("Ca")
+    profile = store.profile(2)
+    assert profile.shape == (len(COLUMNS), 20)
+    assert np.shares_memory(profile, store.values)
+
+    ca = store.parameter("Ca")
+    assert ca.shape == (3, len(DEPTH_CHOICE))
+    assert np.shares_memory(ca, store.values)
+    assert store.decode(ca[0]).tolist() == [row["Ca"] for row in _profiles()[0]["data"]]
+    assert np.isnan(store.decode(ca[2, 20:])).all()  # Padding after the short profile
+
+    window = store.depth_range(1, 10, 20)
+    assert np.shares_memory(window, store.values)
+    assert store.decode(window[COLUMNS.index("Depth")]).tolist() == [10, 12, 14, 16, 18, 20]
+    assert store.decode(window[column]).tolist() == [row["Ca"] for row in _profiles()[1]["data"][5:11]]
+
+
+def test_values_file_is_not_filled_on_create(tmp_path):
+    store = EnsembleStore.create(str(tmp_path / "store"), capacity=1000, n_depths=501)
+    stat = os.stat(os.path.join(store.path, VALUES_FILE))
+    assert stat.st_size == 1000 * len(COLUMNS) * 501 * 8
+    if hasattr(stat, "st_blocks"):
+        assert stat.st_blocks * 512 < stat.st_size // 10  # Sparse until profiles are appended
+
+
+def test_read_only_full_and_out_of_range(store):
+    with pytest.raises(ValueError):
+        EnsembleStore(store.path).append(_profiles()[0])
+    store.append(_profiles()[0])
+    with pytest.raises(IndexError):
+        store.append(_profiles()[0])
+    with pytest.raises(IndexError):
+        store.profile(4)
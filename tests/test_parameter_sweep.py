@@ -0,0 +1,51 @@
+# test_parameter_sweep.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import PARAMETERS
+from parameter_sweep import SweepRunner, SweepCatalog
+
+GRID = {
+    "base_types": ["Rock"],
+    "env_types": ["Wetland"],
+    "depth_ranges": [(0, 40)],
+    "custom_ranges": {
+        # Wide enough that no built-in trend leaves it
+        "wide": {zone: {param: (0, 1000, "RM") for param in PARAMETERS} for zone in range(1, 6)},
+        # Three shares that cannot sum to 100 inside their ranges, so generate_sum_to_100 falls back
+        "impossible": {zone: {"OM": (50, 60, "RM"), "CC": (50, 60, "RM"), "IM": (50, 60, "RM")} for zone in range(1, 6)},
+    },
+    "replicates": 2,
+    "validate": True,
+}
+
+
+def test_failed_validation_fails_the_cell(tmp_path):
+    assert SweepRunner(GRID, str(tmp_path), workers=1).run() == 2
+    catalog = SweepCatalog(str(tmp_path))
+    try:
+        status, violations = catalog.status("Rock", "Wetland", (0, 40), "impossible")
+        assert status == "failed" and violations["range"] > 0
+        with pytest.raises(ValueError):
+            catalog.open("Rock", "Wetland", (0, 40), "impossible")
+        assert len(catalog.open("Rock", "Wetland", (0, 40), "impossible", allow_failed=True)) == 2
+        assert catalog.status("Rock", "Wetland", (0, 40), "wide") == ("complete", None)
+        assert len(catalog.open("Rock", "Wetland", (0, 40), "wide")) == 2
+    finally:
+        catalog.close()
+    assert SweepRunner(GRID, str(tmp_path), workers=1).run() == 0  # Failed cells are not re-run on resume
+
+
+def test_gate_covers_only_the_chosen_rules(tmp_path):
+    SweepRunner({**GRID, "validate": ["lof_sum", "grain_size_sum"]}, str(tmp_path), workers=1).run()
+    catalog = SweepCatalog(str(tmp_path))
+    try:
+        assert catalog.status("Rock", "Wetland", (0, 40), "impossible") == ("complete", None)
+    finally:
+        catalog.close()
+    with pytest.raises(ValueError):
+        SweepRunner({**GRID, "validate": ["no_such_rule"]}, str(tmp_path))
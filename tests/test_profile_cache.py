@@ -0,0 +1,67 @@
+# test_profile_cache.py
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import ProfileGenerator
+from compact_values import CompactProfile
+from profile_cache import ProfileCache
+
+DEPTH_CHOICE = list(range(0, 101, 2))
+ZONES = [15, 35, 30, 15, 5]
+
+
+def _key(seed=1, table=None):
+    table = table or ProfileGenerator().compile_ranges("Sand", "Lake")
+    return ProfileCache.key(seed, DEPTH_CHOICE, ZONES, "Sand", "Lake", table)
+
+
+def _blob_size(data):
+    buf = io.BytesIO()
+    CompactProfile.from_records(data).save(buf)
+    return len(buf.getvalue())
+
+
+def test_key_is_stable_and_covers_every_input():
+    table = ProfileGenerator().compile_ranges("Sand", "Lake")
+    reordered = {zone: dict(reversed(list(ranges.items()))) for zone, ranges in reversed(list(table.items()))}
+    listed = {zone: {param: list(r) for param, r in ranges.items()} for zone, ranges in table.items()}
+    assert _key(table=table) == _key(table=reordered) == _key(table=listed)
+    assert len(_key()) == 64
+
+    changed = {**table, 5: {**table[5], "MS": (1, 2, "RM")}}
+    keys = {_key(), _key(seed=2), _key(table=changed),
+            ProfileCache.key(1, DEPTH_CHOICE[:-1], ZONES, "Sand", "Lake", table),
+            ProfileCache.key(1, DEPTH_CHOICE, ZONES[::-1], "Sand", "Lake", table),
+            ProfileCache.key(1, DEPTH_CHOICE, ZONES, "Rock", "Lake", table)}
+    assert len(keys) == 6
+
+
+def test_generate_profile_is_served_from_the_cache_after_a_restart(tmp_path):
+    path = str(tmp_path / "profiles.sqlite")
+    first = ProfileGenerator(cache=ProfileCache(path)).generate_profile(DEPTH_CHOICE, ZONES, "Sand", "Lake", seed=1)
+
+    reopened = ProfileCache(path)
+    assert reopened.stats()["entries"] == 1
+    assert reopened.get(_key()) == first
+    assert ProfileGenerator(cache=reopened).generate_profile(DEPTH_CHOICE, ZONES, "Sand", "Lake", seed=1) == first
+
+
+def test_eviction_keeps_recently_read_entries_under_the_cap(tmp_path):
+    data = ProfileGenerator().generate_profile(DEPTH_CHOICE, ZONES, "Sand", "Lake", seed=1)
+    size = _blob_size(data)
+    cache = ProfileCache(str(tmp_path / "profiles.sqlite"), max_mb=3.5 * size / (1024 * 1024))
+    for key in "abc":
+        cache.put(key, data)
+    assert cache.get("a") == data  # Queued touch; written by the next put, before it evicts
+    cache.put("d", data)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == data for key in "acd")
+    assert cache.stats()["bytes"] == 3 * size <= cache.max_bytes
+
+    cache.put("d", data)  # Replacing an entry must not count its size twice
+    reopened = ProfileCache(cache.path, max_mb=3.5 * size / (1024 * 1024))
+    assert reopened.stats() == {"entries": 3, "bytes": 3 * size, "max_bytes": cache.max_bytes}
@@ -0,0 +1,63 @@
+# test_profile_generator.py
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import ProfileGenerator
+
+DEPTH_CHOICE = list(range(0, 201, 2))
+
+
+def test_same_seed_same_profile_on_fresh_generators():
+    first = ProfileGenerator().generate_seeded_profile(7, DEPTH_CHOICE, "Lake sediment", "Peatland")
+    second = ProfileGenerator().generate_seeded_profile(7, DEPTH_CHOICE, "Lake sediment", "Peatland")
+    assert first == second
+
+
+def test_same_seed_same_profile_on_reused_generator():
+    generator = ProfileGenerator()
+    first = generator.generate_seeded_profile(7, DEPTH_CHOICE, "Lake sediment", "Peatland")
+    generator.generate_seeded_profile(8, DEPTH_CHOICE, "Rock", "Wetland")  # Leaves trend state behind
+    second = generator.generate_seeded_profile(7, DEPTH_CHOICE, "Lake sediment", "Peatland")
+    assert first == second
+
+
+def test_different_seeds_differ():
+    generator = ProfileGenerator()
+    first = generator.generate_seeded_profile(7, DEPTH_CHOICE, "Sand", "Lake")
+    second = generator.generate_seeded_profile(8, DEPTH_CHOICE, "Sand", "Lake")
+    assert first["data"] != second["data"]
+
+
+def _stagnant_generator(trend):
+    """Generator with MS set to a stagnant trend in every Sand/Lake zone, as the UI allows."""
+    generator = ProfileGenerator()
+    for zone in generator.zones:
+        ranges = dict(generator.get_parameter_ranges("Sand", "Lake", zone), MS=(100, 500, trend))
+        generator.custom_ranges[(zone, "Sand", "Lake")] = ranges
+    return generator
+
+
+@pytest.mark.parametrize("trend", ["SL", "SH"])
+def test_parallel_matches_serial_with_stagnant_trends(trend):
+    generator = _stagnant_generator(trend)
+    depth_choice = list(range(0, 1001, 2))
+    zone_percentages = [15, 35, 30, 15, 5]
+    serial = generator.generate_profile(depth_choice, zone_percentages, "Sand", "Lake", seed=1)
+    parallel = generator.generate_profile_parallel(depth_choice, zone_percentages, "Sand", "Lake", seed=1)
+    assert len(parallel) == len(serial) == 501
+    assert [(row["Depth"], row["Zone"]) for row in parallel] == [(row["Depth"], row["Zone"]) for row in serial]
+    assert all(100 <= row["MS"] <= 500 for row in parallel)
+
+
+def test_parallel_profile_does_not_depend_on_workers():
+    generator = ProfileGenerator()
+    zone_percentages = [15, 35, 30, 15, 5]
+    one = generator.generate_profile_parallel(DEPTH_CHOICE, zone_percentages, "Rock", "Wetland", seed=3, workers=1)
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        three = generator.generate_profile_parallel(DEPTH_CHOICE, zone_percentages, "Rock", "Wetland", seed=3, executor=pool)
+    assert one == three
@@ -0,0 +1,77 @@
+# test_profile_validator.py
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import ProfileGenerator, PARAMETERS, COLUMNS
+from profile_validator import ProfileValidator, RULES
+
+
+def _validator():
+    """Validator whose Sand/Lake zones allow 0-100 everywhere, with WL rising and CR falling."""
+    generator = ProfileGenerator()
+    for zone in generator.zones:
+        ranges = {param: (0, 100, "RM") for param in PARAMETERS}
+        ranges.update(WL=(0, 100, "UP"), CR=(0, 100, "DN"))
+        generator.custom_ranges[(zone, "Sand", "Lake")] = ranges
+    return ProfileValidator(generator)
+
+
+def _clean_block():
+    """One Sand/Lake profile of four rows over zones 1, 1, 2, 2 that breaks no rule."""
+    block = np.full((1, len(COLUMNS), 4), 10.0)
+    col = COLUMNS.index
+    block[0, col("Depth")] = [0, 2, 4, 6]
+    block[0, col("Zone")] = [1, 1, 2, 2]
+    for parts in (("OM", "CC", "IM"), ("Clay", "Silt", "Sand")):
+        for param, value in zip(parts, (20, 30, 50)):
+            block[0, col(param)] = value
+    block[0, col("WL")] = [10, 20, 5, 30]  # Rises within each zone
+    block[0, col("CR")] = [30, 20, 40, 5]  # Falls within each zone
+    return block
+
+
+def _validate(block):
+    return _validator().validate(block, [1], [0])  # Sand, Lake
+
+
+def test_clean_block_passes():
+    report = _validate(_clean_block())
+    assert report.ok
+    assert report.summary() == {rule: 0 for rule in RULES}
+
+
+@pytest.mark.parametrize("rule, column, row, value, location", [
+    ("lof_sum", "OM", 1, 25, [0, 1]),
+    ("grain_size_sum", "Sand", 3, 40, [0, 3]),
+    ("range", "MS", 2, 150, [0, PARAMETERS.index("MS"), 2]),
+    ("zone_contiguity", "Zone", 3, 1, [0, 3]),
+    ("trend_monotonic", "WL", 1, 5, [0, PARAMETERS.index("WL"), 1]),
+    ("trend_monotonic", "CR", 3, 45, [0, PARAMETERS.index("CR"), 3]),
+])
+def test_each_rule_flags_its_violation(rule, column, row, value, location):
+    block = _clean_block()
+    block[0, COLUMNS.index(column), row] = value
+    report = _validate(block)
+    assert report.summary() == {r: int(r == rule) for r in RULES}
+    assert report.location_array(rule).tolist() == [location]
+
+
+def test_padding_and_all_zero_rows_are_exempt():
+    block = _clean_block()
+    block[0, :, 3] = np.nan  # Padding after the profile's last depth
+    for param in ("OM", "CC", "IM"):
+        block[0, COLUMNS.index(param), 0] = 0  # generate_data writes zeros when a zone has no range
+    assert _validate(block).ok
+
+
+def test_validate_records_matches_block():
+    generator = ProfileGenerator()
+    data = generator.generate_profile(list(range(0, 201, 2)), [15, 35, 30, 15, 5], "Rock", "Wetland", seed=1)
+    validator = ProfileValidator(generator)
+    block = np.array([[[row[col] for row in data] for col in COLUMNS]], dtype=float)
+    assert validator.validate_records(data, "Rock", "Wetland").summary() == validator.validate(block, [0], [2]).summary()
@@ -0,0 +1,35 @@
+# test_report_renderer.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from profile_generator import ProfileGenerator
+from report_renderer import render_report
+
+DEPTH_CHOICE = list(range(0, 101, 2))
+
+
+@pytest.fixture(scope="module")
+def profiles():
+    generator = ProfileGenerator()
+    return [generator.generate_seeded_profile(seed, DEPTH_CHOICE, "Sand", "Lake") for seed in range(4)]
+
+
+def test_pdf_report_has_one_page_per_profile(tmp_path, profiles):
+    pypdf = pytest.importorskip("pypdf")
+    output = tmp_path / "report.pdf"
+    assert render_report(str(output), profiles=profiles, workers=2) == 4
+    assert len(pypdf.PdfReader(str(output)).pages) == 4
+
+
+def test_png_report_reuses_the_figure_cleanly(tmp_path, profiles):
+    # The same profile rendered first and last by one worker must give the same image
+    pages = [profiles[0]["data"], profiles[1]["data"], profiles[2]["data"], profiles[0]["data"]]
+    assert render_report(str(tmp_path), profiles=pages, fmt="png", workers=1, dpi=50) == 4
+    names = sorted(os.listdir(tmp_path))
+    assert names == [f"profile_{i:05d}.png" for i in range(1, 5)]
+    first, last = [(tmp_path / name).read_bytes() for name in (names[0], names[-1])]
+    assert first.startswith(b"\x89PNG") and first == last